@@ -1,10 +1,14 @@
 # app.py
+import atexit
+
 import dash
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
+from pathlib import Path
 
 from components.header import header_product1
 from components.table_component import table_layout
+from components.dataset_selector import dataset_selector
 # from components.table_component_test import table_layout_test as table_layout
 from components.sidebar_closed import sidebar_closed
 from components.sidebar_opened import sidebar_opened
@@ -13,6 +17,27 @@ from callbacks.table_callbacks import register_table_callbacks
 from callbacks.sidebar_callbacks import register_sidebar_callbacks
 from callbacks.register_callbacks import register_all_callbacks
 from utils import constants
+from database.registry import configure_dataset, get_registry
+from database.watcher import start_dataset_watcher
+from database.ingest import register_ingest_route
+from utils.filtering import warm_filter_caches
+from utils.column_groups import DEFAULT_ACTIVE_GROUPS, columns_for_groups
+
+# 表示するデータセット（初回アクセス時に読み込まれる）
+DATA_PATH = Path(__file__).resolve().parent / "database" / "test_output_20000.csv"
+# DATA_PATH = Path(__file__).resolve().parent / "database" / "test_output_200000.csv"
+# 起動時は表示中の列グループの列だけを読み、残りは必要になったときに読み足す
+configure_dataset(DATA_PATH, columns=columns_for_groups(DEFAULT_ACTIVE_GROUPS))
+
+# database/ の CSV が書き換わったら、バックグラウンドで読み直して差し替える
+start_dataset_watcher(
+    get_registry(),
+    interval=constants.DATASET_WATCH_INTERVAL_SEC,
+    warm=warm_filter_caches,
+)
+
+# 終了時に派生データ（インデックス・選択肢など）を書き出し、次回起動時に読み戻す
+atexit.register(get_registry().save_snapshots)
 
 
 app = Dash(
@@ -22,6 +47,10 @@ app = Dash(
     suppress_callback_exceptions=True,
 )
 
+# 差分 CSV の追記（append-only）を HTTP で受け付ける
+if constants.INGEST_ENDPOINT_ENABLED:
+    register_ingest_route(app.server)
+
 # register_table_callbacks(app)
 # サイドバー開閉用コールバック
 register_sidebar_callbacks(app)
@@ -40,14 +69,17 @@ app.layout = html.Div(
         html.Div(
             [
                 sidebar_closed,
-                sidebar_opened,
+                sidebar_opened(),
             ],
             style={"flex": "0 0 auto"},
         ),
 
         # テーブル領域（残り全部を使う）
         html.Div(
-            table_layout,
+            [
+                dataset_selector(),
+                table_layout,
+            ],
             id="table-area",
             style={
                 "width": "90%",
@@ -61,6 +93,12 @@ app.layout = html.Div(
 
         dcc.Store(id="filters-draft", storage_type="memory"),
         dcc.Store(id="filters-state", storage_type="memory"),
+        # コールバックが書き換えたスライダーの値 {キー: 値}（filters-draft には入れない）
+        dcc.Store(id="filters-synced", storage_type="memory"),
+
+        # ホットリロード：表示中データセットの版（変わったらテーブル等を再描画）
+        dcc.Store(id="dataset-version", storage_type="memory"),
+        dcc.Interval(id="dataset-poll", interval=constants.DATASET_POLL_INTERVAL_MS),
 
 # テーブル表示日表示切替ボタン用
         # 列グループの表示状態（例: ["meta", "products", ...]）
@@ -68,7 +106,7 @@ app.layout = html.Div(
             id="column-groups-state",
             storage_type="memory",
             # data=["meta", "products", "categories", "quantities", "mixed"],
-            data=["products", "categories", "quantities", "mixed"],
+            data=DEFAULT_ACTIVE_GROUPS,
         ),
 
     ],
@@ -1,6 +1,6 @@
 from dash import Input, Output, State
-from components.table_component import test_df
-from utils.filtering import apply_all_filters
+from utils.query_backend import table_page
+from utils.column_groups import columns_for_groups
 
 
 def register_apply_filters(app):
@@ -22,20 +22,15 @@ def register_apply_filters(app):
         Input("table", "page_current"),
         Input("table", "page_size"),
         Input("table", "sort_by"),
+        Input("column-groups-state", "data"),   # 列グループ ON で新しい列を返すため
+        Input("dataset-select", "value"),
+        Input("dataset-version", "data"),       # ホットリロードで差し替わったら再描画
     )
-    def apply_filters(state, page_current, page_size, sort_by):
-        df = apply_all_filters(state)
-
-        # sort / paging
-        if sort_by:
-            df = df.sort_values(
-                [s["column_id"] for s in sort_by],
-                ascending=[s["direction"] == "asc" for s in sort_by],
-            )
-
-        page_current = page_current or 0
-        page_size = page_size or 100
-        start = page_current * page_size
-        end = start + page_size
-
-        return df.iloc[start:end].to_dict("records")
+    def apply_filters(state, page_current, page_size, sort_by, active_groups,
+                      dataset_name, _version):
+        # フィルタ → ソート → ページ分けは constants.QUERY_BACKEND の経路で行い、
+        # 表示中の列グループの列だけを返す
+        return table_page(
+            state, sort_by, page_current, page_size,
+            columns_for_groups(active_groups), dataset_name,
+        )
@@ -1,65 +1,17 @@
 # callbacks/collapse_callbacks.py
-from dash import Input, Output, State
+from dash import MATCH, Input, Output, State
 
+from components.filters.filter_components import filter_id
 
-def register_collapse_callbacks(app):
 
-    # ---------- product1 ----------
-    @app.callback(
-        Output("collapse-product1", "is_open"),
-        Input("toggle-product1", "n_clicks"),
-        State("collapse-product1", "is_open"),
-        prevent_initial_call=True,
-    )
-    def toggle_product1(n, is_open):
-        return not is_open
-
-    # ---------- product2 ----------
-    @app.callback(
-        Output("collapse-product2", "is_open"),
-        Input("toggle-product2", "n_clicks"),
-        State("collapse-product2", "is_open"),
-        prevent_initial_call=True,
-    )
-    def toggle_product2(n, is_open):
-        return not is_open
-
-    # ---------- mixed1 ----------
-    @app.callback(
-        Output("collapse-mixed1", "is_open"),
-        Input("toggle-mixed1", "n_clicks"),
-        State("collapse-mixed1", "is_open"),
-        prevent_initial_call=True,
-    )
-    def toggle_mixed1(n, is_open):
-        return not is_open
-
-    # ---------- quantity1 ----------
-    @app.callback(
-        Output("collapse-quantity1", "is_open"),
-        Input("toggle-quantity1", "n_clicks"),
-        State("collapse-quantity1", "is_open"),
-        prevent_initial_call=True,
-    )
-    def toggle_quantity1(n, is_open):
-        return not is_open
+def register_collapse_callbacks(app):
 
-    # ---------- date ----------
+    # ---------- フィルタの見出しクリックで開閉（全フィルタ共通） ----------
     @app.callback(
-        Output("collapse-date", "is_open"),
-        Input("toggle-date", "n_clicks"),
-        State("collapse-date", "is_open"),
+        Output(filter_id("collapse", MATCH), "is_open"),
+        Input(filter_id("toggle", MATCH), "n_clicks"),
+        State(filter_id("collapse", MATCH), "is_open"),
         prevent_initial_call=True,
     )
-    def toggle_date(n, is_open):
+    def toggle_filter(n, is_open):
         return not is_open
-
-    # ---------- review_cluster ----------
-    @app.callback(
-        Output("collapse-review-cluster", "is_open"),
-        Input("toggle-review-cluster", "n_clicks"),
-        State("collapse-review-cluster", "is_open"),
-        prevent_initial_call=True,
-    )
-    def toggle_review_cluster(n, is_open):
-        return not is_open
\ No newline at end of file
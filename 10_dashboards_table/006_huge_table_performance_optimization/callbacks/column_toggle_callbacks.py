@@ -1,8 +1,23 @@
 # callbacks/column_toggle_callbacks.py
 from dash import Input, Output, State, callback_context
 
-from utils.column_groups import COLUMN_GROUPS, META_COLUMNS
+from utils.column_groups import (
+    COLUMN_GROUPS,
+    DEFAULT_ACTIVE_GROUPS,
+    META_COLUMNS,
+    columns_for_groups,
+)
 from utils.columns_config import COLUMNS
+from database.registry import get_dataset, retry_stale
+from utils import constants
+
+
+@retry_stale
+def _load_columns(dataset_name, columns):
+    """
+    表示する列を読み込む（元ファイルが書き換わった後なら新しい版に読み込む）。
+    """
+    get_dataset(dataset_name).ensure_columns(columns)
 
 
 def register_column_toggle_callbacks(app):
@@ -38,7 +53,7 @@ def register_column_toggle_callbacks(app):
     ):
         # 旧: state = current_state or ["meta", "products", "categories", "quantities", "mixed"]
         # Meta は常に表示にするので、state では管理しない
-        state = current_state or ["products", "categories", "quantities", "mixed"]
+        state = current_state or list(DEFAULT_ACTIVE_GROUPS)
 
         ctx = callback_context
         if not ctx.triggered:
@@ -84,8 +99,9 @@ def register_column_toggle_callbacks(app):
     @app.callback(
         Output("table", "hidden_columns"),
         Input("column-groups-state", "data"),
+        State("dataset-select", "value"),
     )
-    def update_hidden_columns(active_groups):
+    def update_hidden_columns(active_groups, dataset_name):
         active_groups = set(active_groups or [])
 
         # Meta 列は常に可視
@@ -100,6 +116,11 @@ def register_column_toggle_callbacks(app):
         all_ids = [c["id"] for c in COLUMNS]
         hidden = [cid for cid in all_ids if cid not in visible]
 
+        # 初めて ON になったグループの列はここで読み込む（以降はキャッシュ）
+        # （pandas 以外の経路はバックエンドが全列を持っているので読み込まない）
+        if constants.QUERY_BACKEND == "pandas":
+            _load_columns(dataset_name, columns_for_groups(active_groups))
+
         return hidden
 
     # ③ state → ボタンの濃淡（outline）
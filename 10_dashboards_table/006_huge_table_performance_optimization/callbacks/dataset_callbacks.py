@@ -0,0 +1,102 @@
+# callbacks/dataset_callbacks.py
+from bisect import bisect_left, bisect_right
+
+import dash
+from dash import ALL, Input, Output, State, callback_context
+
+from components.filters.filter_components import (
+    date_slider_range,
+    filter_id,
+    range_slider_step,
+)
+from utils.filter_config import FILTERS
+from utils.query_backend import dataset_version, numeric_bounds, unique_dates
+
+
+def _date_indices(dates, date_range, max_idx):
+    """
+    選択中の日付範囲 ["YYYY-MM-DD", "YYYY-MM-DD"] を、新しい版のユニーク日付の index に直す。
+    """
+    if not date_range or len(dates) == 0:
+        return [0, max_idx]
+    keys = [d.strftime("%Y-%m-%d") for d in dates]
+    start = min(bisect_left(keys, date_range[0]), max_idx)
+    end = max(bisect_right(keys, date_range[1]) - 1, start)
+    return [start, min(end, max_idx)]
+
+
+def register_dataset_callbacks(app):
+
+    # ① ホットリロード検知：表示中データセットの版が変わったら dataset-version を更新
+    #    （QUERY_BACKEND が pandas 以外なら、バックエンドが読み込んだ版を見る）
+    #    （table などはこの Store を Input にして再描画する）
+    @app.callback(
+        Output("dataset-version", "data"),
+        Input("dataset-poll", "n_intervals"),
+        State("dataset-select", "value"),
+        State("dataset-version", "data"),
+    )
+    def poll_dataset_version(_n, dataset_name, current_version):
+        version = dataset_version(dataset_name)
+        if version is None or version == current_version:
+            return dash.no_update
+        return version
+
+    # ② データセット切り替え / 新しい版 → 範囲・日付スライダーの範囲を作り直す
+    #    切り替え時は value を全範囲に戻し、filters-draft の範囲・日付の条件も消す（None）。
+    #    新しい版への差し替え（ポーリング・/ingest の追記）では選択中の範囲を変えない。
+    #    範囲スライダーは min / max / step だけを書き、value には触らない。
+    #    日付スライダーは index ベースなので、選択中の日付を新しい版の index に直して書く
+    #    （filters-synced に入れるので filters-draft は変わらない）。
+    @app.callback(
+        Output(filter_id("date", ALL), "min"),
+        Output(filter_id("date", ALL), "max"),
+        Output(filter_id("date", ALL), "marks"),
+        Output(filter_id("date", ALL), "value"),
+        Output(filter_id("range", ALL), "min"),
+        Output(filter_id("range", ALL), "max"),
+        Output(filter_id("range", ALL), "step"),
+        Output(filter_id("range", ALL), "value"),
+        Output("filters-synced", "data", allow_duplicate=True),
+        Output("filters-draft", "data", allow_duplicate=True),
+        Input("dataset-select", "value"),
+        Input("dataset-version", "data"),
+        State("filters-draft", "data"),
+        prevent_initial_call=True,
+    )
+    def update_slider_ranges(dataset_name, _version, draft):
+        draft = draft or {}
+
+        triggered = [t["prop_id"].split(".")[0] for t in callback_context.triggered]
+        keep_selection = "dataset-select" not in triggered
+
+        # ここで書いた value は、filters-draft のコールバックでユーザーの選択として扱わない
+        synced = {}
+
+        dates = ([], [], [], [])
+        available = unique_dates(dataset_name)
+        for output in callback_context.outputs_list[0]:
+            spec = FILTERS[output["id"]["key"]]
+            d_min, d_max, marks = date_slider_range(available)
+            d_value = [d_min, d_max]
+            if keep_selection:
+                d_value = _date_indices(available, draft.get(spec["key"]), d_max)
+            synced[spec["key"]] = d_value
+            for out, value in zip(dates, (d_min, d_max, marks, d_value)):
+                out.append(value)
+
+        ranges = ([], [], [], [])
+        for output in callback_context.outputs_list[4]:
+            spec = FILTERS[output["id"]["key"]]
+            q_min, q_max = numeric_bounds(spec["column"], dataset_name)
+            if not keep_selection:
+                synced[spec["key"]] = [q_min, q_max]
+            for out, value in zip(ranges, (q_min, q_max, range_slider_step(q_min, q_max), [q_min, q_max])):
+                out.append(value)
+
+        if keep_selection:
+            unchanged = [dash.no_update] * len(ranges[3])
+            return (*dates, *ranges[:3], unchanged, synced, dash.no_update)
+        # 全範囲は「条件なし」なので、draft には範囲を入れずに None にする
+        cleared = {**draft, **{key: None for key in synced}}
+        return (*dates, *ranges, synced, cleared)
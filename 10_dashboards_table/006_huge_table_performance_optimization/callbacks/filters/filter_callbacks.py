@@ -0,0 +1,190 @@
+# callbacks/filters/filter_callbacks.py
+"""
+サイドバーのフィルタのコールバック（utils/filter_config.py の登録簿から作った部品用）。
+
+部品の id はパターンマッチ用の dict（components/filters/filter_components.py）なので、
+フィルタの数に関係なく、種類ごとに 1 つのコールバックで全フィルタ分を受け持つ。
+フィルタを増やしてもコールバックは増えない。
+"""
+import json
+
+import dash
+from dash import ALL, MATCH, Input, Output, State, callback_context
+
+from components.filters.filter_components import filter_id, histogram_bars
+from database.histogram import Histogram
+from utils.filter_config import FILTERS
+from utils.query_backend import checklist_values, numeric_bounds, range_histogram, unique_dates
+
+
+def _date_range(value, dataset_name):
+    """
+    日付の RangeSlider の値（ユニーク日付の index）→ ["YYYY-MM-DD", "YYYY-MM-DD"]。
+    """
+    dates = unique_dates(dataset_name)
+    if not dates or not value or len(value) != 2:
+        return None
+    start_idx, end_idx = (max(0, min(i, len(dates) - 1)) for i in value)
+    return [
+        dates[start_idx].strftime("%Y-%m-%d"),
+        dates[end_idx].strftime("%Y-%m-%d"),
+    ]
+
+
+def _draft_value(component, key, value, dataset_name):
+    """
+    部品の値 → filters-draft に入れる値（未選択は None / []）。
+    スライダーが列の全範囲（両端）のままなら未選択（None）にする。
+    [min, max] を条件として入れると、欠損・文字列の行まで落ちてしまうため。
+    """
+    if component == "filter-checklist":
+        return value or []
+    if component == "filter-text":
+        return value.strip() if value and value.strip() else None
+    if not value or len(value) != 2:
+        return None
+    if component == "filter-range":
+        low, high = numeric_bounds(FILTERS[key]["column"], dataset_name)
+        if float(value[0]) <= low and float(value[1]) >= high:
+            return None
+        return [float(value[0]), float(value[1])]
+
+    # 日付の RangeSlider は index ベースなので、実際の日付に変換して保存する
+    if value[0] <= 0 and value[1] >= len(unique_dates(dataset_name)) - 1:
+        return None
+    return _date_range(value, dataset_name)
+
+
+def _matching_values(values, search_text):
+    if search_text and search_text.strip():
+        s = search_text.lower()
+        return [v for v in values if s in str(v).lower()]
+    return values
+
+
+def register_filter_callbacks(app):
+
+    # ① いずれかのフィルタの部品が変わった → そのフィルタの値だけ filters-draft に保存
+    #    コールバック（データセットの切り替え・新しい版）が書き換えた値は filters-synced に
+    #    入っているので、ユーザーの選択としては扱わずに読み捨てる
+    @app.callback(
+        Output("filters-draft", "data", allow_duplicate=True),
+        Output("filters-synced", "data", allow_duplicate=True),
+        Input(filter_id("checklist", ALL, live=ALL), "value"),
+        Input(filter_id("range", ALL), "value"),
+        Input(filter_id("date", ALL), "value"),
+        Input(filter_id("text", ALL), "value"),
+        State("filters-draft", "data"),
+        State("filters-synced", "data"),
+        State("dataset-select", "value"),
+        prevent_initial_call=True,
+    )
+    def update_filters_draft(_checklists, _ranges, _dates, _texts, current_state,
+                             synced, dataset_name):
+        state = dict(current_state or {})
+        synced = dict(synced or {})
+        changed = False
+        for triggered in callback_context.triggered:
+            component_id, _ = triggered["prop_id"].rsplit(".", 1)
+            if not component_id.startswith("{"):
+                continue
+            component_id = json.loads(component_id)
+            key = component_id["key"]
+            if key in synced and synced.pop(key) == triggered["value"]:
+                continue
+            state[key] = _draft_value(
+                component_id["type"], key, triggered["value"], dataset_name
+            )
+            changed = True
+        return (state if changed else dash.no_update), synced
+
+    # ② 範囲の表示 + 分布の塗り分け
+    #    スライダーを動かすたびに呼ばれるので、行は見ずに Store のヒストグラム（ビン数分）だけで描く
+    @app.callback(
+        Output(filter_id("range-display", MATCH), "children"),
+        Output(filter_id("histogram-bars", MATCH), "children"),
+        Input(filter_id("range", MATCH), "value"),
+        Input(filter_id("histogram", MATCH), "data"),
+    )
+    def update_range_display(value, histogram):
+        bars = histogram_bars(histogram, value)
+        if not value or len(value) != 2:
+            return "No range selected", bars
+        rows = Histogram.from_dict(histogram).estimate(float(value[0]), float(value[1]))
+        return f"{float(value[0]):.2f} 〜 {float(value[1]):.2f} (~{rows:,} rows)", bars
+
+    # ②' 範囲スライダーの分布：他フィルタ（確定済みの filters-state）に合う行のヒストグラム
+    #    （pandas の経路では読み込み時に作った各行のビン番号を、絞り込んだ行位置で数えるだけ）
+    @app.callback(
+        Output(filter_id("histogram", MATCH), "data"),
+        Input("filters-state", "data"),
+        Input("dataset-select", "value"),
+        Input("dataset-version", "data"),
+        prevent_initial_call=True,
+    )
+    def update_range_histogram(state, dataset_name, _version):
+        spec = FILTERS[callback_context.outputs_list["id"]["key"]]
+        return range_histogram(
+            spec["column"], state, ignore_keys=[spec["key"]], dataset=dataset_name
+        ).to_dict()
+
+    # ③ 日付の範囲の表示
+    @app.callback(
+        Output(filter_id("date-display", MATCH), "children"),
+        Input(filter_id("date", MATCH), "value"),
+        State("dataset-select", "value"),
+    )
+    def update_date_display(value, dataset_name):
+        date_range = _date_range(value, dataset_name)
+        if not unique_dates(dataset_name):
+            return "No date data"
+        if date_range is None:
+            return "No range selected"
+        return f"{date_range[0]} 〜 {date_range[1]}"
+
+    # ④ チェックリストの選択肢：他フィルタ（確定済みの filters-state）+ 検索で更新
+    #    （value は触らない）
+    @app.callback(
+        Output(filter_id("checklist", MATCH, live=False), "options"),
+        Input("filters-state", "data"),
+        Input(filter_id("search", MATCH), "value"),
+        Input("dataset-select", "value"),
+    )
+    def update_checklist_options(state, search_text, dataset_name):
+        spec = FILTERS[callback_context.outputs_list["id"]["key"]]
+
+        # 自分は ignore、他フィルタだけ適用
+        # DataFrame は作らず、フィルタに合う行のこの列の値だけを拾う
+        all_values = checklist_values(
+            spec["column"], state, ignore_keys=[spec["key"]], dataset=dataset_name
+        )
+        return [
+            {"label": str(v), "value": str(v)}
+            for v in _matching_values(all_values, search_text)
+        ]
+
+    # ⑤ live なチェックリスト：いじり途中の filters-draft で選択肢を更新し、
+    #    選択肢に無くなった選択値は外す
+    @app.callback(
+        Output(filter_id("checklist", MATCH, live=True), "options"),
+        Output(filter_id("checklist", MATCH, live=True), "value"),
+        Input("filters-draft", "data"),
+        Input(filter_id("search", MATCH), "value"),
+        Input("dataset-select", "value"),
+        State(filter_id("checklist", MATCH, live=True), "value"),
+    )
+    def update_live_checklist_options(state, search_text, dataset_name, current_values):
+        spec = FILTERS[callback_context.outputs_list[0]["id"]["key"]]
+
+        all_values = [
+            str(v) for v in checklist_values(
+                spec["column"], state, ignore_keys=[spec["key"]], dataset=dataset_name,
+            )
+        ]
+        options = [
+            {"label": v, "value": v} for v in _matching_values(all_values, search_text)
+        ]
+
+        available = {opt["value"] for opt in options}
+        new_values = [v for v in (current_values or []) if v in available]
+        return options, new_values
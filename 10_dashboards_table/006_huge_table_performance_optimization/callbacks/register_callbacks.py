@@ -1,23 +1,14 @@
 from callbacks.apply_filters import register_apply_filters
-from callbacks.filters.product1_filter_callbacks import register_product1_filter
-from callbacks.filters.product2_filter_callbacks import register_product2_filter
-from callbacks.filters.mixed1_filter_callbacks import register_mixed1_filter
-from callbacks.filters.quantity1_filter_callbacks import register_quantity1_filter
-from callbacks.filters.date_filter_callbacks import register_date_filter
+from callbacks.filters.filter_callbacks import register_filter_callbacks
 from callbacks.collapse_callbacks import register_collapse_callbacks
 
 # テーブル表示日表示切替ボタン用
 from callbacks.column_toggle_callbacks import register_column_toggle_callbacks
-
-from callbacks.filters.review_cluster_filter_callbacks import register_review_cluster_filter
+from callbacks.dataset_callbacks import register_dataset_callbacks
 
 def register_all_callbacks(app):
-    register_product1_filter(app)
-    register_product2_filter(app)
-    register_mixed1_filter(app)
-
-    register_quantity1_filter(app)  # quantity_1 slider
-    register_date_filter(app)       # date slider
+    # サイドバーのフィルタ（utils/filter_config.py の登録簿から。種類ごとに 1 つずつ）
+    register_filter_callbacks(app)
 
     register_apply_filters(app)     # テーブル本体（server-side paging + sort）
     register_collapse_callbacks(app)
@@ -25,4 +16,4 @@ def register_all_callbacks(app):
 # テーブル表示日表示切替ボタン用
     register_column_toggle_callbacks(app)
 
-    register_review_cluster_filter(app)   # ★ 追加
\ No newline at end of file
+    register_dataset_callbacks(app)       # データセット切り替え
\ No newline at end of file
@@ -1,7 +1,8 @@
 # callbacks/table_callbacks.py
 
 from dash import Input, Output
-from components.table_component import test_df
+from database.registry import get_dataset
+from database.schema import decode_page
 
 def register_table_callbacks(app):
     @app.callback(  # ← ここが重要！
@@ -13,4 +14,4 @@ def register_table_callbacks(app):
     def update_table(page_current, page_size):
         start = page_current * page_size
         end = (page_current + 1) * page_size
-        return test_df.iloc[start:end].to_dict("records")
+        return decode_page(get_dataset().df.iloc[start:end])
@@ -0,0 +1,32 @@
+# components/dataset_selector.py
+from dash import html, dcc
+
+from database.registry import get_registry
+
+
+def dataset_selector():
+    """
+    表示するデータセット（database/ 配下の CSV）を選ぶドロップダウン。
+    選択はセッション単位で保持する。
+    """
+    registry = get_registry()
+
+    return html.Div(
+        [
+            html.Span("Dataset:", style={"marginRight": "8px"}),
+            dcc.Dropdown(
+                id="dataset-select",
+                options=[{"label": n, "value": n} for n in registry.names()],
+                value=registry.default_name,
+                clearable=False,
+                persistence=True,
+                persistence_type="session",
+                style={"width": "320px", "fontSize": "12px"},
+            ),
+        ],
+        style={
+            "display": "flex",
+            "alignItems": "center",
+            "marginBottom": "8px",
+        },
+    )
@@ -0,0 +1,245 @@
+# components/filters/filter_components.py
+"""
+フィルタの仕様（utils/filter_config.py）からサイドバーの部品を作る。
+
+部品の id はパターンマッチ用の dict（{"type": ..., "key": filters-state のキー}）にしてあり、
+callbacks/filters/filter_callbacks.py が種類ごとに 1 つのコールバックで全フィルタ分を受け持つ。
+- チェックリスト: {"type": "filter-checklist", "key", "live"} + 検索ボックス {"type": "filter-search"}
+- 範囲          : {"type": "filter-range"} + 表示 {"type": "filter-range-display"}
+                  + 分布 {"type": "filter-histogram"}（Store）/ {"type": "filter-histogram-bars"}
+- 日付          : {"type": "filter-date"}（ユニーク日付の index）+ 表示 {"type": "filter-date-display"}
+- 部分一致・全文検索: {"type": "filter-text"}
+- 開閉          : {"type": "filter-toggle"} / {"type": "filter-collapse"}
+"""
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+
+from database.histogram import Histogram
+from utils.query_backend import column_values, numeric_bounds, range_histogram, unique_dates
+
+
+def filter_id(component, key, **extra):
+    return {"type": f"filter-{component}", "key": key, **extra}
+
+
+def range_slider_step(low, high):
+    return (high - low) / 100 if high > low else 1
+
+
+def date_slider_range(unique_dates):
+    """
+    ユニーク日付から RangeSlider の (min, max, marks) を作る。
+    データセット切り替え時のコールバックからも使う。
+    """
+    if len(unique_dates) == 0:
+        # fallback
+        return 0, 1, {0: "N/A", 1: "N/A"}
+
+    min_idx, max_idx = 0, len(unique_dates) - 1
+
+    # マークは端＋中間くらいに
+    marks = {
+        0: unique_dates[0].strftime("%Y-%m-%d"),
+        max_idx: unique_dates[-1].strftime("%Y-%m-%d"),
+    }
+    if max_idx > 2:
+        mid = max_idx // 2
+        marks[mid] = unique_dates[mid].strftime("%Y-%m-%d")
+    return min_idx, max_idx, marks
+
+
+def histogram_bars(data, value=None):
+    """
+    ヒストグラム（Histogram.to_dict() の形）の棒グラフ。スライダーの範囲に入るビンを濃く塗る。
+    ビンの数だけ Div を作るので、行数に関係なく軽い。
+    """
+    histogram = Histogram.from_dict(data)
+    edges, counts = histogram.edges, histogram.counts
+    peak = max(int(counts.max()), 1) if len(counts) else 1
+    low, high = value if value and len(value) == 2 else (edges[0], edges[-1])
+
+    return [
+        html.Div(
+            style={
+                "flex": "1",
+                "height": f"{100 * int(n) / peak:.1f}%",
+                "minHeight": "1px" if n else "0",
+                "backgroundColor": "#0d6efd" if edges[i + 1] >= low and edges[i] <= high else "#cfe2ff",
+            },
+        )
+        for i, n in enumerate(counts)
+    ]
+
+
+def checklist_filter(spec):
+    """
+    値を選ぶフィルタ（上に検索ボックス、下に値の一覧）。
+    """
+    options = [
+        {"label": str(val), "value": str(val)}
+        for val in column_values(spec["column"])
+    ]
+
+    return html.Div(
+        [
+            html.Label(spec["label"], className="form-label"),
+
+            dcc.Input(
+                id=filter_id("search", spec["key"]),
+                type="text",
+                placeholder="Search",
+                style={"width": "100%", "marginBottom": "8px"},
+            ),
+
+            html.Div(
+                dcc.Checklist(
+                    id=filter_id("checklist", spec["key"], live=spec["live"]),
+                    options=options,
+                    value=[],
+                    inputStyle={"marginRight": "8px"},
+                    labelStyle={"display": "block", "marginBottom": "6px"},
+                ),
+                style={
+                    "maxHeight": "180px",
+                    "overflowY": "auto",
+                    "border": "1px solid #ddd",
+                    "borderRadius": "6px",
+                    "padding": "6px",
+                },
+            ),
+        ],
+        style={"padding": "10px"},
+    )
+
+
+def range_filter(spec):
+    """
+    数値の範囲フィルタ（mixed_* は数値部分の範囲）。スライダーの上に値の分布を出す。
+    """
+    # min/max・ヒストグラムは選んだクエリの経路で求める（pandas ならデータセット側でキャッシュ）
+    low, high = numeric_bounds(spec["column"])
+    histogram = range_histogram(spec["column"], {}).to_dict()
+
+    return html.Div(
+        [
+            html.Label(f"{spec['label']} range", className="form-label"),
+
+            # 他のフィルタに合う行の分布（filters-state が変わると filter_callbacks.py で更新）
+            dcc.Store(id=filter_id("histogram", spec["key"]), data=histogram),
+            html.Div(
+                histogram_bars(histogram),
+                id=filter_id("histogram-bars", spec["key"]),
+                style={
+                    "display": "flex",
+                    "alignItems": "flex-end",
+                    "gap": "1px",
+                    "height": "40px",
+                    "margin": "0 12px",
+                },
+            ),
+
+            dcc.RangeSlider(
+                id=filter_id("range", spec["key"]),
+                min=low,
+                max=high,
+                value=[low, high],  # 初期は全範囲
+                step=range_slider_step(low, high),
+                tooltip={"placement": "bottom", "always_visible": False},
+                allowCross=False,
+            ),
+
+            html.Div(
+                id=filter_id("range-display", spec["key"]),
+                style={"marginTop": "8px", "fontSize": "12px"},
+            ),
+        ],
+        style={"padding": "10px"},
+    )
+
+
+def date_filter(spec):
+    """
+    日付の範囲フィルタ（RangeSlider はユニーク日付の index で動かす）。
+    """
+    min_idx, max_idx, marks = date_slider_range(unique_dates())
+
+    return html.Div(
+        [
+            html.Label(f"{spec['label']} range", className="form-label"),
+
+            dcc.RangeSlider(
+                id=filter_id("date", spec["key"]),
+                min=min_idx,
+                max=max_idx,
+                value=[min_idx, max_idx],
+                step=1,
+                marks=marks,
+                allowCross=False,
+            ),
+
+            html.Div(
+                id=filter_id("date-display", spec["key"]),
+                style={"marginTop": "8px", "fontSize": "12px"},
+            ),
+        ],
+        style={"padding": "10px"},
+    )
+
+
+def text_filter(spec, placeholder="Contains"):
+    """
+    部分一致のフィルタ（入力を止めたとき・Enter で反映）。
+    """
+    return html.Div(
+        [
+            html.Label(spec["label"], className="form-label"),
+
+            dcc.Input(
+                id=filter_id("text", spec["key"]),
+                type="text",
+                placeholder=placeholder,
+                debounce=True,
+                style={"width": "100%"},
+            ),
+        ],
+        style={"padding": "10px"},
+    )
+
+
+def search_filter(spec):
+    """
+    全文検索のフィルタ（空白区切りは AND、OR、"..." はフレーズ）。部品は部分一致と同じ。
+    """
+    return text_filter(spec, placeholder='words OR "a phrase"')
+
+
+_BUILDERS = {
+    "checklist": checklist_filter,
+    "range": range_filter,
+    "date": date_filter,
+    "text": text_filter,
+    "search": search_filter,
+}
+
+
+def filter_section(spec):
+    """
+    見出し（クリックで開閉）+ フィルタ本体。
+    """
+    return html.Div(
+        [
+            html.Div(
+                [
+                    html.Span(spec["label"], className="filter-title"),
+                    html.Span("▼", className="filter-icon"),
+                ],
+                id=filter_id("toggle", spec["key"]),
+                className="filter-toggle",
+            ),
+            dbc.Collapse(
+                _BUILDERS[spec["type"]](spec),
+                id=filter_id("collapse", spec["key"]),
+                is_open=False,
+            ),
+        ]
+    )
@@ -1,6 +1,4 @@
 from dash import html, dash_table
-import pandas as pd
-from pathlib import Path
 
 from utils.columns_config import COLUMNS
 from utils.columns_styles import style_cell_conditional
@@ -8,9 +6,8 @@ from utils.columns_styles import style_cell_conditional
 # テーブル表示日表示切替ボタン用
 from components.column_toggle_bar import column_toggle_bar
 
-DATA_PATH = Path(__file__).resolve().parents[1] / "database" / "test_output_20000.csv"
-# DATA_PATH = Path(__file__).resolve().parents[1] / "database" / "test_output_200000.csv"
-test_df = pd.read_csv(DATA_PATH)
+# データは database/registry.py の get_dataset() から遅延で読み込む
+# （読み込むファイルは app.py で指定する）
 
 table_layout = html.Div(
     [
@@ -0,0 +1,42 @@
+# database/backend_pool.py
+"""
+クエリのバックエンド（database/queries_*.py）をデータセットごとに 1 つ持っておく入れ物。
+
+バックエンドは読み込んだ版（エンジンの接続・LazyFrame・メモリマップ）をずっと持つので、
+開いておくデータセットの数を QUERY_BACKEND_MAX_DATASETS までにして、
+いちばん長く使っていないものから close() する（また選ばれたら開き直す）。
+"""
+import threading
+from collections import OrderedDict
+
+from database.registry import get_registry
+from utils.constants import QUERY_BACKEND_MAX_DATASETS
+
+
+class BackendPool:
+
+    def __init__(self, factory, limit=QUERY_BACKEND_MAX_DATASETS):
+        self.factory = factory
+        self.limit = limit
+        self._backends = OrderedDict()   # 元ファイルのパス -> バックエンド（末尾ほど最近使った）
+        self._lock = threading.Lock()
+
+    def get(self, name=None):
+        """
+        データセット名（None は既定）のバックエンド。無ければ作り、上限を超えた分を閉じる。
+        """
+        registry = get_registry()
+        path = registry.data_dir / registry.resolve(name)
+        evicted = []
+        with self._lock:
+            backend = self._backends.get(path)
+            if backend is None:
+                backend = self.factory(path)
+                self._backends[path] = backend
+            self._backends.move_to_end(path)
+            while len(self._backends) > max(self.limit, 1):
+                evicted.append(self._backends.popitem(last=False)[1])
+        # 閉じるのはロックの外で（古い版を使っているクエリが終わるのを待つことがある）
+        for old in evicted:
+            old.close()
+        return backend
@@ -0,0 +1,190 @@
+# database/bitmap_index.py
+"""
+チェックリスト用の転置インデックス（値 → 行の集合）。
+
+以前は毎回 df[col].astype(str).isin([...]) で全行を文字列化・照合していた。
+ここでは列ごとに 1 回だけ「値ごとの行番号の一覧」を作っておき、
+チェックリストのフィルタは行の集合の和（同じ列の選択値）と積（列どうし）で求める。
+
+行の集合は Roaring Bitmap と同じ考え方で 2 通りの持ち方を使い分ける。
+- 行番号の配列（int32, 昇順）… 行が少ない値（全体の 1/32 以下）
+- 詰めたビット列（np.packbits）… 行が多い値（配列より小さくなる）
+どちらも選んだ値の行数に比例した手間で和・積を取れる（ビット列は n/8 バイト単位）。
+"""
+import numpy as np
+import pandas as pd
+
+# 行の割合がこれを超える値はビット列も持つ（int32 の配列よりビット列が小さくなる境目）
+DENSE_RATIO = 1 / 32
+
+
+class RowSet:
+    """
+    行の集合。rows（昇順の行番号）か bits（np.packbits のビット列）のどちらかで持つ。
+    """
+
+    def __init__(self, n, rows=None, bits=None):
+        self.n = n
+        self.rows = rows
+        self.bits = bits
+
+    def __len__(self):
+        if self.rows is not None:
+            return len(self.rows)
+        return int(np.unpackbits(self.bits, count=self.n).sum())
+
+    def _bits(self):
+        if self.bits is not None:
+            return self.bits
+        return _pack(self.rows, self.n)
+
+    def contains(self, rows):
+        """
+        rows（行番号の配列）それぞれがこの集合に入っているかの bool 配列。
+        """
+        if self.bits is not None:
+            bits = self.bits
+            return ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+        return np.isin(rows, self.rows, assume_unique=True)
+
+    def intersect(self, other: "RowSet") -> "RowSet":
+        if self.rows is not None and other.rows is not None:
+            return RowSet(self.n, rows=np.intersect1d(self.rows, other.rows, assume_unique=True))
+        if self.rows is not None:
+            return RowSet(self.n, rows=self.rows[other.contains(self.rows)])
+        if other.rows is not None:
+            return RowSet(self.n, rows=other.rows[self.contains(other.rows)])
+        return RowSet(self.n, bits=self._bits() & other._bits())
+
+    def positions(self):
+        """
+        集合に入っている行番号（昇順）。
+        """
+        if self.rows is not None:
+            return self.rows
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.n)).astype(np.int32)
+
+
+def _pack(rows, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+class BitmapIndex:
+    """
+    1 列分の転置インデックス。
+    - values: 値の番号順の値（文字列の Index。フィルタの state は文字列で来るので文字列で引く）
+    - rows  : 値の番号順に並べた行番号（int32）。値 i の行は rows[starts[i]:starts[i + 1]]
+    - dense : {値の番号: ビット列}（行の多い値だけ）
+    """
+
+    def __init__(self, n, values, rows, starts, dense):
+        self.n = n
+        self.values = values
+        self.rows = rows
+        self.starts = starts
+        self.dense = dense
+
+    @classmethod
+    def build(cls, series: pd.Series, offset=0, dense=True):
+        n = offset + len(series)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # 読み込み時に辞書化済みの列は、そのコードをそのまま値の番号に使う
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories.astype(str)
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            values = pd.Index(uniques).astype(str)
+        present = codes >= 0
+        codes = codes[present]
+        rows = (np.flatnonzero(present) + offset).astype(np.int32)
+
+        order = np.argsort(codes, kind="stable")
+        rows = rows[order]
+        counts = np.bincount(codes, minlength=len(values))
+        starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        index = cls(n, values, rows, starts, {})
+        if dense:
+            index._build_dense(np.flatnonzero(counts > n * DENSE_RATIO))
+        return index
+
+    def _build_dense(self, value_ids):
+        self.dense = {
+            int(i): _pack(self.rows[self.starts[i]:self.starts[i + 1]], self.n)
+            for i in value_ids
+        }
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        """
+        フィルタの選択値を値の番号（int の配列、昇順）に変える。列に無い値は捨てる。
+        """
+        ids = self.values.get_indexer([str(v) for v in values])
+        return np.unique(ids[ids >= 0])
+
+    def value_rows(self, value):
+        ids = self.encode([value])
+        if len(ids) == 0:
+            return self.rows[:0]
+        i = ids[0]
+        return self.rows[self.starts[i]:self.starts[i + 1]]
+
+    def select(self, values) -> RowSet:
+        """
+        values のどれかに一致する行（同じ列の選択値の和）。
+        """
+        return self.select_codes(self.encode(values))
+
+    def select_codes(self, ids) -> RowSet:
+        """
+        値の番号 ids のどれかに一致する行。
+        """
+        total = sum(int(self.starts[i + 1] - self.starts[i]) for i in ids)
+
+        if total <= self.n * DENSE_RATIO:
+            parts = [self.rows[self.starts[i]:self.starts[i + 1]] for i in ids]
+            rows = np.sort(np.concatenate(parts)) if len(parts) > 1 else (
+                parts[0] if parts else self.rows[:0]
+            )
+            return RowSet(self.n, rows=rows)
+
+        bits = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        for i in ids:
+            dense = self.dense.get(i)
+            if dense is not None:
+                bits |= dense
+            else:
+                part = self.rows[self.starts[i]:self.starts[i + 1]]
+                bits |= _pack(part, self.n)
+        return RowSet(self.n, bits=bits)
+
+    def append(self, series: pd.Series, offset) -> "BitmapIndex":
+        """
+        offset 行目から series の行を足したインデックス（行の追記用）。
+        値ごとの行番号をつなぎ直し、行が多くなった値のビット列を作り直す。
+        """
+        delta = BitmapIndex.build(series, offset=offset, dense=False)
+        n = delta.n
+
+        # 値の番号をそろえてから（新しい値は後ろに足す）、
+        # 番号順（同じ値の中は行番号順）に並べ直す
+        delta_ids = self.values.get_indexer(delta.values)
+        added = delta_ids < 0
+        delta_ids[added] = len(self.values) + np.arange(added.sum())
+        values = self.values.append(delta.values[added])
+
+        old_codes = np.repeat(np.arange(len(self.values)), np.diff(self.starts))
+        new_codes = np.repeat(delta_ids, np.diff(delta.starts))
+        codes = np.concatenate([old_codes, new_codes])
+        order = np.argsort(codes, kind="stable")
+        rows = np.concatenate([self.rows, delta.rows])[order].astype(np.int32)
+        counts = np.bincount(codes, minlength=len(values))
+        starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        index = BitmapIndex(n, values, rows, starts, {})
+        index._build_dense(np.flatnonzero(counts > n * DENSE_RATIO))
+        return index
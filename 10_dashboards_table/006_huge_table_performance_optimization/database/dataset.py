@@ -0,0 +1,666 @@
+# database/dataset.py
+"""
+テーブル用データセット（Dataset）と、その遅延読み込み（DatasetProvider）。
+
+以前は components/table_component.py が import 時に CSV を読み込み、
+各モジュールが `test_df` を直接 import していた。
+ここでは DatasetProvider が「最初に使われたときに 1 回だけ」読み込むので、
+UI モジュールを import しただけではデータは読まれない。
+アプリからは database/registry.py の get_dataset() 経由で使う。
+
+    from database.registry import get_dataset
+    df = get_dataset().df
+
+起動時は表示に必要な列だけを読み込み（configure_dataset(columns=...)）、
+それ以外の列は ensure_columns() で必要になったときに読み足す。
+派生データは database/snapshot.py のスナップショットから読み戻せる（snapshots=True）。
+"""
+import sys
+import threading
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from database.bitmap_index import BitmapIndex
+from database.date_partitions import DatePartitionIndex
+from database.histogram import BinnedColumn, Histogram
+from database.mixed import MixedArray, MixedDtype, split_mixed
+from database.range_index import SortedRangeIndex
+from database.schema import SCHEMA, concat_rows
+from database.token_index import TokenIndex
+from database.snapshot import restore_snapshot, save_snapshot
+from database.dataset_loader import (
+    content_hash,
+    file_fingerprint,
+    load_columns,
+    load_dataset,
+    read_column_names,
+)
+
+DATA_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA_PATH = DATA_DIR / "test_output_20000.csv"
+
+
+_SAMPLE_ITEMS = 256   # _nbytes が list / set の要素を測る数（残りは平均で見積もる）
+
+
+def _nbytes(value, seen=None):
+    """
+    派生データのおおよそのバイト数。NumPy / pandas / Arrow の配列は nbytes
+    （pandas は memory_usage(deep=False)）をそのまま使い、dict / list / 属性を持つオブジェクト
+    （インデックスのクラスなど）は中身を足し合わせる。配列の中身は見ないのでコピーも走査もしない。
+    長い list / set は先頭 _SAMPLE_ITEMS 個の平均から見積もる。
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=False))
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    if isinstance(value, (dict, list, tuple, set, frozenset)):
+        # 長いもの（選択肢の値の一覧・トークンの辞書など）は先頭の一部だけ測って個数倍する
+        items = value.items() if isinstance(value, dict) else value
+        sample = list(islice(items, _SAMPLE_ITEMS))
+        if not sample:
+            return sys.getsizeof(value)
+        measured = sum(_nbytes(item, seen) for item in sample)
+        return sys.getsizeof(value) + measured * len(value) // len(sample)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + _nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class StaleDatasetError(RuntimeError):
+    """
+    元ファイルが書き換わった後の（古い版の）Dataset に列を読み足そうとしたときのエラー。
+    古い版に新しいファイルの列は混ぜられないので、呼び出し元は新しい版に差し替えてやり直す
+    （database/registry.py の retry_stale()）。
+    """
+
+    def __init__(self, dataset):
+        super().__init__(f"dataset {dataset.path} changed on disk; reload it before loading columns")
+        self.dataset = dataset
+
+
+class Dataset:
+    """
+    読み込み済みの DataFrame と、そこから作る派生データ
+    （ユニーク日付・チェックリストの選択肢・スライダーの min/max など）のキャッシュ。
+    """
+
+    def __init__(self, df: pd.DataFrame, path=None, column_loader=None,
+                 all_columns=None, fingerprint=None):
+        self.df = df
+        self.path = Path(path) if path is not None else None
+        # 読み込んだ時点のファイルの (サイズ, mtime_ns)。version の元になる
+        self.fingerprint = fingerprint
+        # 読み込んだ時点のファイルの中身のハッシュ。スナップショットのキーに使う
+        self.content_hash = None
+        # スナップショットに書いてある（読み戻した）派生データの key。増えていなければ書き直さない
+        self.snapshot_keys = frozenset()
+        self._column_loader = column_loader
+        self.all_columns = list(all_columns) if all_columns is not None else list(df.columns)
+        # 追記（append_rows）の回数。ファイルは同じでも版を変えるために使う
+        self.generation = 0
+        self._derived = {}
+        self._extenders = {}
+        self._memory_bytes = None
+        self._derived_bytes = {}   # key -> 派生データのバイト数（入れたときに 1 回だけ測る）
+        self._lock = threading.RLock()   # builder が別の派生データを使うことがあるので再入可
+        self._columns_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    @property
+    def version(self):
+        """
+        データセットの版。ファイルが差し替わると変わるので、
+        データセットに紐づくキャッシュのキーに含める。
+        """
+        if self.fingerprint is None:
+            version = f"mem-{id(self):x}"
+        else:
+            size, mtime_ns = self.fingerprint
+            version = f"{size:x}-{mtime_ns:x}"
+        if self.generation:
+            version += f"-g{self.generation}"
+        return version
+
+    def is_stale(self):
+        """
+        読み込み後に元ファイルが書き換わっていれば True。
+        """
+        if self.path is None or self.fingerprint is None:
+            return False
+        return file_fingerprint(self.path) != self.fingerprint
+
+    def ensure_columns(self, columns):
+        """
+        指定列のうち未読み込みのものを読み足す（読み込み済みなら何もしない）。
+        読み足すときは新しい DataFrame を作ってから差し替えるので、
+        処理中の他のコールバックが見ている DataFrame は変わらない。
+        ファイルが書き換わった後に未読み込みの列を求められたら StaleDatasetError。
+        """
+        missing = [
+            c for c in dict.fromkeys(columns)
+            if c not in self.df.columns and c in self.all_columns
+        ]
+        if not missing or self._column_loader is None:
+            return self.df
+
+        # ファイルが書き換わった後は、古い版に新しいファイルの列を混ぜない
+        # （列の無い DataFrame を返すとインデックスの構築が KeyError になるので、
+        #   呼び出し元に新しい版でやり直させる）
+        if self.is_stale():
+            raise StaleDatasetError(self)
+
+        with self._columns_lock:
+            missing = [c for c in missing if c not in self.df.columns]
+            if missing:
+                extra = self._column_loader(missing)
+                df = pd.concat([self.df, extra.set_axis(self.df.index)], axis=1)
+                # 列順はファイル上の順にそろえておく
+                order = [c for c in self.all_columns if c in df.columns]
+                self.df = df[order]
+                self._memory_bytes = None
+        return self.df
+
+    def memory_bytes(self):
+        """
+        DataFrame + 派生データ（cached() のインデックス・ビットマップ・ヒストグラム・
+        全文検索のインデックスなど）のメモリ使用量。
+        DataFrame は列を読み足したときだけ測り直し、派生データは入れたとき（作った・
+        スナップショットから読み戻した・追記で引き継いだとき）に測った値を足すだけ。
+        レジストリが get() のたびに呼ぶので、ここでは測り直さない。
+        """
+        if self._memory_bytes is None:
+            self._memory_bytes = int(self.df.memory_usage(deep=True).sum())
+        return self._memory_bytes + sum(self._derived_bytes.values())
+
+    def _store(self, key, value):
+        """
+        派生データを入れて大きさを測っておく。ロックを持った状態で呼ぶ。
+        """
+        self._derived[key] = value
+        self._derived_bytes[key] = _nbytes(value)
+
+    def release(self):
+        """
+        インデックスや派生データのキャッシュを捨てる（レジストリから追い出されたとき）。
+        DataFrame 本体は、処理中のコールバックが参照し終われば解放される。
+        """
+        with self._lock:
+            self._derived.clear()
+            self._derived_bytes = {}
+
+    def warm(self, columns=(), numeric_columns=()):
+        """
+        よく使う派生データを先に作っておく（差し替え前のバックグラウンド構築用）。
+        """
+        self.ensure_columns(["date", *columns, *numeric_columns])
+        self.unique_dates()
+        for col in columns:
+            self.column_values(col)
+        for col in numeric_columns:
+            self.numeric_bounds(col)
+            self.binned(col)
+
+    def cached(self, key, builder, extender=None):
+        """
+        key ごとに builder() の結果を 1 回だけ計算して保持する。
+        extender(old_value, delta_df, offset) を渡しておくと、
+        行の追記（append_rows）のときに作り直さず差分だけで更新される
+        （渡していない派生データは追記後に作り直す）。
+        """
+        try:
+            value = self._derived[key]
+        except KeyError:
+            pass
+        else:
+            # スナップショットから読み戻した値には extender が付いていない
+            if extender is not None and key not in self._extenders:
+                self._extenders[key] = extender
+            return value
+        with self._lock:
+            if key not in self._derived:
+                self._store(key, builder())
+                if extender is not None:
+                    self._extenders[key] = extender
+            return self._derived[key]
+
+    def snapshot_items(self):
+        """
+        スナップショットに書き出す派生データ（{key: 値} のコピー）。
+        """
+        with self._lock:
+            return dict(self._derived)
+
+    def restore_items(self, items):
+        """
+        スナップショットから読み戻した派生データを入れる（計算済みのものは上書きしない）。
+        """
+        with self._lock:
+            for key, value in items.items():
+                if key not in self._derived:
+                    self._store(key, value)
+
+    def append_rows(self, delta: pd.DataFrame) -> "Dataset":
+        """
+        delta（スキーマ変換済み）の行を後ろに足した新しい Dataset を返す（self は変更しない）。
+        - 行番号は既存行の続き（len(self) から）
+        - 派生データ・インデックスは extender があるものだけ差分で引き継ぐ
+        - 未読み込みの列は「元ファイルの列 + delta の列」として後から読めるようにする
+        """
+        base = self.df
+        offset = len(base)
+        delta = delta.reindex(columns=self.all_columns)
+        delta_loaded = delta[list(base.columns)]
+
+        df = concat_rows(base, delta_loaded)
+
+        column_loader = None
+        if self._column_loader is not None:
+            parent_loader = self._column_loader
+
+            def column_loader(cols):
+                return concat_rows(parent_loader(cols), delta[cols])
+
+        new = Dataset(
+            df,
+            path=self.path,
+            column_loader=column_loader,
+            all_columns=self.all_columns,
+            fingerprint=self.fingerprint,
+        )
+        new.generation = self.generation + 1
+
+        # 追記分は型をそろえた状態で extender に渡す
+        delta_typed = df.iloc[offset:]
+        with self._lock:
+            derived = list(self._derived.items())
+            extenders = dict(self._extenders)
+        for key, value in derived:
+            extender = extenders.get(key)
+            if extender is None:
+                continue
+            new._store(key, extender(value, delta_typed, offset))
+            new._extenders[key] = extender
+        return new
+
+    def unique_dates(self):
+        """
+        date 列のユニーク日付（昇順の datetime.date 配列）。
+        date の RangeSlider は index ベースなので、この並びで日付に変換する。
+        """
+        self.ensure_columns(["date"])
+
+        def build():
+            if "date" not in self.df.columns:
+                return []
+            dates = self.df["date"]
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors="coerce")
+            dates = dates.dropna().sort_values()
+            return list(dates.dt.date.unique())
+
+        def extend(old, delta, offset):
+            if "date" not in delta.columns:
+                return old
+            new_dates = pd.to_datetime(delta["date"], errors="coerce").dropna()
+            return sorted(set(old) | set(new_dates.dt.date.unique()))
+
+        return self.cached("unique_dates", build, extend)
+
+    def column_values(self, col):
+        """
+        チェックリスト用：列のユニーク値（欠損除外・昇順）。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            if col not in self.df.columns:
+                return []
+            s = self.df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                # カテゴリは辞書順なので、出現するコードを拾えばそのまま昇順になる
+                codes = s.cat.codes.to_numpy()
+                return list(s.cat.categories[np.unique(codes[codes >= 0])])
+            return sorted(s.dropna().unique())
+
+        def extend(old, delta, offset):
+            if col not in delta.columns:
+                return old
+            return sorted(set(old) | set(delta[col].dropna().unique()))
+
+        return self.cached(("column_values", col), build, extend)
+
+    def value_counts(self, col):
+        """
+        ファセット用：列の値ごとの件数（欠損除外）。{値: 件数}
+        """
+        self.ensure_columns([col])
+
+        def build():
+            if col not in self.df.columns:
+                return {}
+            return self.df[col].value_counts(dropna=True).to_dict()
+
+        def extend(old, delta, offset):
+            if col not in delta.columns:
+                return old
+            counts = dict(old)
+            for value, n in delta[col].value_counts(dropna=True).items():
+                counts[value] = counts.get(value, 0) + int(n)
+            return counts
+
+        return self.cached(("value_counts", col), build, extend)
+
+    def histogram(self, col) -> Histogram:
+        """
+        数値・日付列のヒストグラム（範囲フィルタの行数の見積もり用）。
+        mixed_* 列は数値部分だけで作る。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return Histogram.build(self.histogram_values(col))
+
+        def extend(old, delta, offset):
+            return old.append(self.histogram_values(col, delta))
+
+        return self.cached(("histogram", col), build, extend)
+
+    def binned(self, col) -> BinnedColumn:
+        """
+        範囲スライダーの分布表示用：histogram(col) と同じビンでの各行のビン番号。
+        絞り込んだ行のヒストグラムはビン番号を数えるだけで作れる（BinnedColumn.subset）。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return BinnedColumn.build(self.histogram(col), self.histogram_values(col))
+
+        def extend(old, delta, offset):
+            return old.append(self.histogram_values(col, delta))
+
+        return self.cached(("binned", col), build, extend)
+
+    def histogram_values(self, col, df=None):
+        """
+        ヒストグラムに入れる値（mixed_* は数値部分。文字列の値は欠損扱い）。
+        df を渡すとその DataFrame（追記分など）の値。
+        """
+        if df is None:
+            df = self.df
+        if self.is_mixed(col) and df is self.df:
+            return self.mixed_column(col).numbers
+        if self.is_mixed(col):
+            return split_mixed(df[col], SCHEMA[col]["decimals"]).numbers
+        return df[col]
+
+    def numeric_bounds(self, col, decimals=2):
+        """
+        RangeSlider 用：数値列の (min, max)。値が無いときは (0, 1)。
+        decimals=None なら丸めずに返す（値が無いときは None）。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            if col not in self.df.columns:
+                return None
+            if self.is_mixed(col):
+                return self.mixed_column(col).number_bounds()
+            return _min_max(self.df[col])
+
+        def extend(old, delta, offset):
+            if col not in delta.columns:
+                return old
+            if self.is_mixed(col):
+                new = split_mixed(delta[col], SCHEMA[col]["decimals"]).number_bounds()
+            else:
+                new = _min_max(delta[col])
+            if old is None or new is None:
+                return old or new
+            return min(old[0], new[0]), max(old[1], new[1])
+
+        bounds = self.cached(("numeric_range", col), build, extend)
+        if decimals is None:
+            return bounds
+        if bounds is None:
+            return 0, 1
+        return round(bounds[0], decimals), round(bounds[1], decimals)
+
+    def bitmap_index(self, col) -> BitmapIndex:
+        """
+        チェックリスト用の転置インデックス（値 → 行の集合）。行番号は self.df の行位置。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return BitmapIndex.build(self.df[col])
+
+        def extend(old, delta, offset):
+            return old.append(delta[col], offset)
+
+        return self.cached(("bitmap", col), build, extend)
+
+    def range_index(self, col) -> SortedRangeIndex:
+        """
+        数値列の範囲フィルタ用インデックス（昇順の値 + 行番号）。行番号は self.df の行位置。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return SortedRangeIndex.build(self.df[col])
+
+        def extend(old, delta, offset):
+            return old.append(delta[col], offset)
+
+        return self.cached(("range", col), build, extend)
+
+    def date_partitions(self, col) -> DatePartitionIndex:
+        """
+        日付の範囲フィルタ用インデックス（月ごとのパーティション + 日付の最小・最大）。
+        行番号は self.df の行位置。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return DatePartitionIndex.build(self.df[col])
+
+        def extend(old, delta, offset):
+            return old.append(delta[col], offset)
+
+        return self.cached(("date_partitions", col), build, extend)
+
+    def token_index(self, col) -> TokenIndex:
+        """
+        全文検索用の転置インデックス（トークン → 値）。値 → 行は bitmap_index(col) で引く。
+        """
+        self.ensure_columns([col])
+
+        def build():
+            return TokenIndex.build(self.column_values(col))
+
+        def extend(old, delta, offset):
+            if col not in delta.columns:
+                return old
+            return old.append(delta[col].dropna().unique())
+
+        return self.cached(("tokens", col), build, extend)
+
+    def is_mixed(self, col):
+        return SCHEMA.get(col, {}).get("kind") == "mixed"
+
+    def mixed_column(self, col) -> MixedArray:
+        """
+        mixed_* 列の型付きの値（数値配列 + 文字列配列。型タグ・ソートキーは使うときに作る）。
+        読み込み時に分けてあるので DataFrame の列そのものを返す
+        （チェックリスト用に辞書化した列だけは分けたものを作ってキャッシュする）。
+        行の並びは self.df と同じ。
+        """
+        self.ensure_columns([col])
+        if isinstance(self.df[col].dtype, MixedDtype):
+            return self.df[col].array
+        decimals = SCHEMA[col]["decimals"]
+
+        def build():
+            return split_mixed(self.df[col], decimals)
+
+        def extend(old, delta, offset):
+            return MixedArray._concat_same_type([old, split_mixed(delta[col], decimals)])
+
+        return self.cached(("mixed", col), build, extend)
+
+    def sort_keys(self, col):
+        """
+        ソートに使う列の値。mixed_* は数値 → 文字列の順位（df と同じ index の Series）、
+        それ以外は列そのもの。
+        """
+        if not self.is_mixed(col):
+            return self.df[col]
+        return pd.Series(self.mixed_column(col).sort_key, index=self.df.index, name=col)
+
+
+def _min_max(series):
+    q = series
+    if not pd.api.types.is_numeric_dtype(q):
+        q = pd.to_numeric(q, errors="coerce")
+    q = q.dropna()
+    if len(q) == 0:
+        return None
+    return float(q.min()), float(q.max())
+
+
+class DatasetProvider:
+    """
+    データセットを初回アクセス時に読み込んで保持する。
+    読み込むファイルと起動時に読む列は configure() でアプリ起動時に選べる
+    （columns=None なら全列）。
+    """
+
+    def __init__(self, path=DEFAULT_DATA_PATH, loader=load_dataset, columns=None,
+                 snapshots=False):
+        self._path = Path(path)
+        self._loader = loader
+        self._columns = list(columns) if columns is not None else None
+        self._snapshots = snapshots
+        self._dataset = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def loaded(self):
+        return self._dataset is not None
+
+    @property
+    def dataset(self):
+        """
+        読み込み済みの Dataset（未読み込みなら None。読み込みは行わない）。
+        """
+        return self._dataset
+
+    def unload(self):
+        """
+        読み込み済みのデータセットを手放す（次回アクセス時に読み直す）。
+        """
+        with self._lock:
+            dataset, self._dataset = self._dataset, None
+        if dataset is not None:
+            dataset.release()
+
+    def configure(self, path=None, loader=None, columns=None):
+        """
+        読み込むファイル（とローダー・起動時に読む列）を差し替える。
+        既に読み込み済みなら破棄し、次回アクセス時に読み直す。
+        """
+        with self._lock:
+            if path is not None:
+                self._path = Path(path)
+            if loader is not None:
+                self._loader = loader
+            self._columns = list(columns) if columns is not None else None
+            self._dataset = None
+
+    def get(self) -> Dataset:
+        dataset = self._dataset
+        if dataset is not None:
+            return dataset
+        with self._lock:
+            if self._dataset is None:
+                self._dataset = self._load(self._columns)
+            return self._dataset
+
+    def build(self) -> Dataset:
+        """
+        今のファイルから新しい Dataset を作る（保持はしない）。
+        読み込み済みの列はそのまま引き継ぐ。
+        """
+        current = self._dataset
+        columns = self._columns
+        if current is not None and columns is not None:
+            columns = list(dict.fromkeys(columns + list(current.df.columns)))
+        return self._load(columns)
+
+    def swap(self, new_dataset, expected=None):
+        """
+        保持している Dataset を new_dataset に差し替える（参照の付け替えだけなので一瞬）。
+        expected を渡した場合、その間に別の版へ変わっていたら差し替えない。
+        戻り値: 差し替え前の Dataset（差し替えなかったら None）
+        """
+        with self._lock:
+            old = self._dataset
+            if expected is not None and old is not expected:
+                return None
+            self._dataset = new_dataset
+        return old
+
+    def save_snapshot(self):
+        """
+        読み込み済みデータセットの派生データをスナップショットに書き出す。
+        """
+        dataset = self._dataset
+        if not self._snapshots or dataset is None:
+            return None
+        try:
+            return save_snapshot(dataset)
+        except Exception as e:  # 書けなくても次回作り直すだけ
+            print(f"[dataset] snapshot write failed for {self._path.name}: {e}")
+            return None
+
+    def _load(self, columns) -> Dataset:
+        path = self._path
+        # 読み込み前に取るので、読み込み中に書き換わっても次の検知で読み直せる
+        fingerprint = file_fingerprint(path)
+        df = self._loader(path, columns=columns)
+        if columns is None:
+            dataset = Dataset(df, path=path, fingerprint=fingerprint)
+        else:
+            dataset = Dataset(
+                df,
+                path=path,
+                column_loader=lambda cols: load_columns(path, cols),
+                all_columns=read_column_names(path),
+                fingerprint=fingerprint,
+            )
+
+        if self._snapshots and fingerprint is not None:
+            dataset.content_hash = content_hash(path, fingerprint)
+            restore_snapshot(dataset)
+        return dataset
+
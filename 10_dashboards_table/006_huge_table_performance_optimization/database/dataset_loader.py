@@ -0,0 +1,499 @@
+# database/dataset_loader.py
+"""
+テーブル用データセットの読み込み。
+
+CSV のパースは重いので、初回読み込み時に列指向キャッシュ（Parquet / Feather）へ
+変換しておき、2 回目以降はキャッシュから読む。
+キャッシュは元 CSV の「サイズ / mtime / ハッシュ」で紐付けていて、
+CSV が変わっていればキャッシュは古いとみなして CSV から読み直す。
+CSV はチャンクごとにパースして database/schema.py の型へ変換し、
+そのままキャッシュへ書き足していく（キャッシュには型付きのデータが入る）。
+
+columns を指定すると、その列だけを読む（キャッシュは列指向なので読む列の分だけで済む）。
+残りの列は load_columns() であとから必要になったときに読む。
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from database.schema import (
+    SCHEMA,
+    apply_schema,
+    combine_chunks,
+    concat_frames,
+    dictionary_columns,
+    memory_report,
+    schema_version,
+    sort_categories,
+)
+
+# キャッシュ置き場（database/.cache/）
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+# "parquet" or "feather"（どちらも pyarrow が必要）
+CACHE_FORMAT = "parquet"
+
+# CSV を読むときの 1 チャンクあたりのメモリ目安（MB）。
+# 大きい CSV でもパース時のピークメモリはおおよそこの値で頭打ちになる
+CSV_CHUNK_MB = 64
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# CSV 1 行のバイト数に対する、パース直後の DataFrame 1 行のメモリの倍率（目安）
+_PARSE_EXPANSION = 4
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_fingerprint(path):
+    """
+    ファイルの (サイズ, mtime_ns)。ファイルが無ければ None。
+    データセットの版（version）やホットリロードの変更検知に使う。
+    """
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def content_hash(path, fingerprint=None, cache_format=CACHE_FORMAT):
+    """
+    ファイルの中身のハッシュ（スナップショットのキーに使う）。
+    fingerprint（読み込み時の (サイズ, mtime_ns)）と一致するキャッシュのメタ情報があれば
+    そのハッシュを使い、無ければ計算する。
+    計算中にファイルが書き換わった（fingerprint と合わない）ときは None。
+    """
+    path = Path(path)
+    fingerprint = fingerprint or file_fingerprint(path)
+    if fingerprint is None:
+        return None
+
+    _, meta_path = _cache_paths(path, cache_format)
+    meta = _read_meta(meta_path)
+    if meta and meta.get("hash") and (meta.get("size"), meta.get("mtime_ns")) == tuple(fingerprint):
+        return meta["hash"]
+
+    digest = _file_hash(path)
+    if file_fingerprint(path) != tuple(fingerprint):
+        return None
+    return digest
+
+
+def _cache_paths(csv_path: Path, cache_format: str):
+    cache_path = CACHE_DIR / f"{csv_path.stem}.{cache_format}"
+    meta_path = CACHE_DIR / f"{csv_path.stem}.{cache_format}.meta.json"
+    return cache_path, meta_path
+
+
+def _read_meta(meta_path: Path):
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _is_cache_fresh(csv_path: Path, cache_path: Path, meta_path: Path):
+    """
+    キャッシュが元 CSV と一致しているかを判定する。
+    - サイズ + mtime が一致 → そのまま有効
+    - サイズは同じで mtime だけ違う（コピー / touch など）→ ハッシュで最終確認
+    戻り値: (有効かどうか, 計算済みならハッシュ / None)
+    """
+    if not cache_path.exists():
+        return False, None
+
+    meta = _read_meta(meta_path)
+    if not meta:
+        return False, None
+
+    if meta.get("schema") != schema_version():
+        return False, None
+
+    stat = csv_path.stat()
+    if meta.get("size") != stat.st_size:
+        return False, None
+    if meta.get("mtime_ns") == stat.st_mtime_ns:
+        return True, meta.get("hash")
+
+    digest = _file_hash(csv_path)
+    if meta.get("hash") != digest:
+        return False, digest
+
+    # 中身は同じ → 次回からハッシュ計算を省けるよう mtime を更新しておく
+    meta["mtime_ns"] = stat.st_mtime_ns
+    try:
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        pass
+    return True, digest
+
+
+def _read_cache(cache_path: Path, cache_format: str, columns=None) -> pd.DataFrame:
+    if cache_format == "feather":
+        return pd.read_feather(cache_path, columns=columns)
+    return pd.read_parquet(cache_path, columns=columns)
+
+
+def _select_columns(available, columns):
+    """
+    指定列のうちファイルに存在するものを、ファイル上の列順で返す（None なら全列）。
+    """
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [c for c in available if c in wanted]
+
+
+def read_column_names(csv_path, cache_format=CACHE_FORMAT):
+    """
+    データセットに含まれる列名の一覧（データ本体は読まない）。
+    """
+    csv_path = Path(csv_path)
+    cache_path, meta_path = _cache_paths(csv_path, cache_format)
+    meta = _read_meta(meta_path)
+    if cache_path.exists() and meta and meta.get("columns"):
+        return list(meta["columns"])
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def _write_meta(csv_path: Path, meta_path: Path, rows, columns, digest=None):
+    stat = csv_path.stat()
+    meta = {
+        "source": csv_path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest or _file_hash(csv_path),
+        "rows": rows,
+        "schema": schema_version(),
+        "columns": list(columns),
+    }
+    tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+    tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    tmp_meta.replace(meta_path)
+
+
+def _chunk_rows(csv_path: Path, chunk_mb) -> int:
+    """
+    1 チャンクの行数を、CSV 先頭の 1 行あたりバイト数から見積もる。
+    パース中の DataFrame は CSV の数倍になるので、その分を割り引く。
+    """
+    with csv_path.open("rb") as f:
+        sample = f.read(_HASH_CHUNK_SIZE)
+    lines = max(sample.count(b"\n"), 1)
+    bytes_per_row = max(len(sample) / lines, 1)
+    return max(1000, int(chunk_mb * 1024 * 1024 / (bytes_per_row * _PARSE_EXPANSION)))
+
+
+def _csv_dtypes(csv_path: Path, usecols=None):
+    """
+    文字列として扱う列は read_csv に str を指定する。
+    チャンクごとの型推測で "15.20" が 15.2 に化けたりしないように。
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return {
+        col: str for col in header
+        if SCHEMA.get(col, {}).get("kind") in ("string", "mixed", "category", "date")
+        and (usecols is None or col in usecols)
+    }
+
+
+def iter_typed_chunks(csv_path, usecols=None, chunk_mb=None, progress=None,
+                      stats=None):
+    """
+    CSV をチャンクごとにパースし、スキーマ変換済みの DataFrame を順に返す。
+    progress(読んだバイト数, 全体バイト数, 読んだ行数) を渡すと各チャンクの後に呼ぶ。
+    stats（dict）を渡すと rows / raw_bytes / typed_bytes を集計する。
+    """
+    csv_path = Path(csv_path)
+    chunk_mb = chunk_mb or CSV_CHUNK_MB
+    total = csv_path.stat().st_size
+    rows = 0
+    # チェックリストの列を辞書化するかは最初のチャンクで決め、以降のチャンクもそろえる
+    dictionary = None
+
+    with csv_path.open("rb") as f:
+        reader = pd.read_csv(
+            f,
+            usecols=usecols,
+            dtype=_csv_dtypes(csv_path, usecols),
+            chunksize=_chunk_rows(csv_path, chunk_mb),
+        )
+        for raw in reader:
+            typed = apply_schema(raw, dictionary=dictionary)
+            if dictionary is None:
+                dictionary = dictionary_columns(typed)
+            rows += len(typed)
+            if stats is not None:
+                stats["rows"] = rows
+                stats["raw_bytes"] = stats.get("raw_bytes", 0) + int(
+                    raw.memory_usage(deep=True).sum()
+                )
+                stats["typed_bytes"] = stats.get("typed_bytes", 0) + int(
+                    typed.memory_usage(deep=True).sum()
+                )
+            del raw
+            if progress is not None:
+                progress(min(f.tell(), total), total, rows)
+            yield typed
+
+
+def _stable_arrow_schema(schema):
+    """
+    チャンク間で型がぶれないようにする（category の index 幅はチャンクの種類数で変わるので int32 に固定）。
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def _unify_dictionaries(path: Path, categories):
+    """
+    チャンクごとに書いた Parquet の辞書列を、全チャンクの値の和（辞書順）の辞書で書き直す。
+    行グループごとに辞書が違うと、読むときのカテゴリが出現順になり
+    読み込みのたびに並べ替え（sort_categories）が要るため。
+    categories: {列名: 辞書順の値のリスト}
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    schema = parquet.schema_arrow
+    dictionaries = {col: pa.array(values, type=schema.field(col).type.value_type)
+                    for col, values in categories.items()}
+    tmp_path = path.with_name(path.name + ".dict")
+    with pq.ParquetWriter(str(tmp_path), schema) as writer:
+        for i in range(parquet.num_row_groups):
+            table = parquet.read_row_group(i)
+            for col, dictionary in dictionaries.items():
+                j = table.schema.get_field_index(col)
+                values = table.column(j).cast(dictionary.type)
+                indices = pc.index_in(values, value_set=dictionary).cast(pa.int32())
+                column = pa.DictionaryArray.from_arrays(indices.combine_chunks(), dictionary)
+                table = table.set_column(j, schema.field(col), column)
+            writer.write_table(table)
+    tmp_path.replace(path)
+
+
+def _write_cache_chunked(csv_path: Path, cache_path: Path, cache_format: str,
+                         chunk_mb=None, progress=None, stats=None):
+    """
+    CSV をチャンクごとに型変換し、列指向キャッシュに追記していく。
+    CSV 全体を DataFrame として持たないので、メモリはチャンク 1 つ分で済む。
+    category 列はチャンクごとにカテゴリが違えば、最後に全チャンクの和（辞書順）で書き直す
+    （Parquet のとき。読み込み時にカテゴリを並べ替えずに済むように）。
+    一時ファイルに書いてから置き換える（途中で落ちても壊れたキャッシュを残さない）。
+    戻り値: キャッシュの列名
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+
+    writer = None
+    schema = None
+    categories = {}   # {列名: [チャンクごとのカテゴリ]}
+    try:
+        for typed in iter_typed_chunks(csv_path, chunk_mb=chunk_mb,
+                                       progress=progress, stats=stats):
+            for col in typed.columns:
+                if isinstance(typed[col].dtype, pd.CategoricalDtype):
+                    categories.setdefault(col, []).append(list(typed[col].cat.categories))
+            table = pa.Table.from_pandas(typed, preserve_index=False)
+            if writer is None:
+                schema = _stable_arrow_schema(table.schema)
+                if cache_format == "feather":
+                    writer = pa.ipc.new_file(
+                        str(tmp_path), schema,
+                        options=pa.ipc.IpcWriteOptions(compression="lz4"),
+                    )
+                else:
+                    writer = pq.ParquetWriter(str(tmp_path), schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if schema is None:   # 空の CSV（ヘッダーのみ）
+        empty = apply_schema(pd.read_csv(csv_path, nrows=0, dtype=_csv_dtypes(csv_path)))
+        if cache_format == "feather":
+            empty.to_feather(tmp_path)
+        else:
+            empty.to_parquet(tmp_path, index=False)
+        columns = list(empty.columns)
+    else:
+        columns = list(schema.names)
+        merged = {
+            col: sorted(set().union(*parts))
+            for col, parts in categories.items()
+            if any(part != parts[0] for part in parts)
+        }
+        if merged and cache_format != "feather":
+            _unify_dictionaries(tmp_path, merged)
+
+    tmp_path.replace(cache_path)
+    return columns
+
+
+def _print_progress(label):
+    """
+    10% ごとに進捗を表示する progress コールバック。
+    """
+    last = {"step": -1}
+
+    def progress(done, total, rows):
+        step = int(done * 10 / total) if total else 10
+        if step != last["step"]:
+            last["step"] = step
+            print(f"[dataset] {label}: {done / total:.0%} ({rows:,} rows)")
+
+    return progress
+
+
+_cache_locks = {}
+_cache_locks_lock = threading.Lock()
+
+
+def _cache_lock(cache_path: Path):
+    """
+    キャッシュのファイルごとのロック。ホットリロードで複数のスレッド（レジストリの監視・
+    クエリのバックエンド）が同じキャッシュを同時に書き出さないようにする。
+    """
+    with _cache_locks_lock:
+        return _cache_locks.setdefault(cache_path, threading.Lock())
+
+
+def ensure_cache(csv_path, cache_format=CACHE_FORMAT, verbose=True, chunk_mb=None):
+    """
+    列指向キャッシュが古い / 無ければ CSV から書き出し、キャッシュのパスを返す
+    （DataFrame は作らない。キャッシュを直接読むクエリエンジン用）。
+    """
+    csv_path = Path(csv_path)
+    cache_path, meta_path = _cache_paths(csv_path, cache_format)
+    with _cache_lock(cache_path):
+        fresh, digest = _is_cache_fresh(csv_path, cache_path, meta_path)
+        if not fresh:
+            stats = {}
+            columns = _write_cache_chunked(
+                csv_path, cache_path, cache_format, chunk_mb=chunk_mb,
+                progress=_print_progress(csv_path.name) if verbose else None, stats=stats,
+            )
+            _write_meta(csv_path, meta_path, stats.get("rows", 0), columns, digest)
+    return cache_path
+
+
+def load_dataset(csv_path, columns=None, cache_format=CACHE_FORMAT,
+                 use_cache=True, verbose=True, chunk_mb=None,
+                 progress=None) -> pd.DataFrame:
+    """
+    CSV を型付きの DataFrame として読み込む。
+    - キャッシュが新しければキャッシュから読む（columns の列だけ）
+    - 古い / 無い場合は CSV をチャンク（chunk_mb MB 目安）ごとにパース・型変換しながら
+      キャッシュへ書き出し、書き終わったキャッシュから読む
+      （CSV 全体を一度に DataFrame にしないので、パース時のメモリはチャンク分で頭打ち）
+    - pyarrow が無い環境では、型変換済みのチャンクをつなげて返す
+      （columns は usecols として渡す）
+    progress(読んだバイト数, 全体バイト数, 読んだ行数) で CSV パースの進捗を受け取れる。
+    """
+    csv_path = Path(csv_path)
+    started = time.perf_counter()
+    if progress is None and verbose:
+        progress = _print_progress(csv_path.name)
+
+    use_cache = use_cache and _has_pyarrow()
+    cache_path, meta_path = _cache_paths(csv_path, cache_format)
+
+    def read_from_cache():
+        selected = _select_columns(read_column_names(csv_path, cache_format), columns)
+        df = _read_cache(cache_path, cache_format, columns=selected)
+        return combine_chunks(sort_categories(df))
+
+    digest = None
+    if use_cache:
+        fresh, digest = _is_cache_fresh(csv_path, cache_path, meta_path)
+        if fresh:
+            try:
+                df = read_from_cache()
+            except Exception as e:  # 壊れたキャッシュは CSV にフォールバック
+                print(f"[dataset] cache read failed ({e}); falling back to CSV")
+            else:
+                if verbose:
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"[dataset] {csv_path.name}: {len(df):,} rows x "
+                        f"{len(df.columns)} cols from {cache_format} cache "
+                        f"in {elapsed:.3f}s"
+                    )
+                return df
+
+    stats = {}
+    df = None
+    if use_cache:
+        try:
+            with _cache_lock(cache_path):
+                cache_columns = _write_cache_chunked(
+                    csv_path, cache_path, cache_format,
+                    chunk_mb=chunk_mb, progress=progress, stats=stats,
+                )
+                _write_meta(csv_path, meta_path, stats.get("rows", 0), cache_columns,
+                            digest)
+            df = read_from_cache()
+            source = f"csv (wrote {cache_format} cache)"
+        except Exception as e:  # キャッシュが書けなくても表示は続ける
+            print(f"[dataset] cache write failed: {e}")
+            stats = {}
+
+    if df is None:
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = [c for c in pd.read_csv(csv_path, nrows=0).columns if c in wanted]
+        chunks = list(iter_typed_chunks(csv_path, usecols=usecols, chunk_mb=chunk_mb,
+                                        progress=progress, stats=stats))
+        df = concat_frames(chunks) if chunks else apply_schema(
+            pd.read_csv(csv_path, nrows=0, usecols=usecols)
+        )
+        del chunks
+        source = "csv"
+
+    if verbose:
+        if stats.get("raw_bytes"):
+            memory_report(stats["raw_bytes"], stats["typed_bytes"], label=csv_path.name)
+        elapsed = time.perf_counter() - started
+        print(
+            f"[dataset] {csv_path.name}: {len(df):,} rows x "
+            f"{len(df.columns)} cols from {source} in {elapsed:.3f}s"
+        )
+    return df
+
+
+def load_columns(csv_path, columns, cache_format=CACHE_FORMAT, verbose=True):
+    """
+    あとから必要になった列だけを読み込む（列グループの ON やフィルタで参照されたとき）。
+    """
+    return load_dataset(csv_path, columns=columns, cache_format=cache_format,
+                        verbose=verbose)
@@ -0,0 +1,157 @@
+# database/date_partitions.py
+"""
+日付列の月ごとのパーティション（日付の範囲フィルタ用インデックス）。
+
+行番号を月ごとにまとめて並べ（同じ月の中は行番号順）、パーティションごとに
+日付の最小・最大（統計）を持っておく。日付の範囲 [low, high] は
+- 統計が範囲と重ならないパーティション … 行を見ずに飛ばす
+- 統計が範囲に収まるパーティション     … 行を見ずに全行を取る
+- 範囲の端にかかるパーティション       … その月の行の日付だけを比較する
+で求めるので、手間は範囲に重なる月の行数に比例する（1 か月なら全体の 1/190 ほど）。
+結果は database/bitmap_index.RowSet なので、他のフィルタは残った行だけで評価される。
+
+テーブルの行の並び（CSV の順）は変えないので、並べ替えているのはこのインデックスの行番号だけ。
+"""
+import numpy as np
+import pandas as pd
+
+from database.bitmap_index import DENSE_RATIO, RowSet, _pack
+
+PARTITION_UNIT = "M"   # パーティションの単位（datetime64 の単位。"M" は月）
+
+
+class DatePartitionIndex:
+    """
+    - n     : 全行数（欠損の行も含む）
+    - keys  : パーティションの月（datetime64[M]、昇順）
+    - starts: パーティション i の行は rows[starts[i]:starts[i + 1]]
+    - rows  : 月順に並べた行番号（int32）
+    - dates : rows と同じ並びの日付（端のパーティションの比較用）
+    - mins / maxs: パーティションごとの日付の最小・最大
+    """
+
+    def __init__(self, n, rows, dates, keys, starts, mins, maxs):
+        self.n = n
+        self.rows = rows
+        self.dates = dates
+        self.keys = keys
+        self.starts = starts
+        self.mins = mins
+        self.maxs = maxs
+
+    @classmethod
+    def build(cls, series: pd.Series, offset=0):
+        if not pd.api.types.is_datetime64_any_dtype(series):
+            series = pd.to_datetime(series, errors="coerce")
+        dates = series.to_numpy()
+        present = ~np.isnat(dates)
+        rows = (np.flatnonzero(present) + offset).astype(np.int32)
+        return cls._grouped(offset + len(series), rows, dates[present])
+
+    @classmethod
+    def _grouped(cls, n, rows, dates):
+        # 月ごとにまとめる（stable なので同じ月の中は行番号順のまま）
+        months = dates.astype(f"datetime64[{PARTITION_UNIT}]")
+        order = np.argsort(months, kind="stable")
+        rows, dates, months = rows[order], dates[order], months[order]
+        # 並べた後なので、月が変わる位置がパーティションの先頭
+        first = np.flatnonzero(np.concatenate([[True], months[1:] != months[:-1]])) \
+            if len(months) else np.zeros(0, dtype=np.int64)
+        if len(rows):
+            mins = np.minimum.reduceat(dates, first)
+            maxs = np.maximum.reduceat(dates, first)
+        else:
+            mins = maxs = dates[:0]
+        return cls(n, rows, dates, months[first], np.append(first, len(rows)).astype(np.int64),
+                   mins, maxs)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _bounds(self, low, high):
+        low = pd.Timestamp(low).to_datetime64().astype(self.dates.dtype)
+        high = pd.Timestamp(high).to_datetime64().astype(self.dates.dtype)
+        return low, high
+
+    def prune(self, low, high):
+        """
+        (範囲に収まるパーティションの番号, 範囲の端にかかるパーティションの番号)。
+        どちらにも入らないパーティションは範囲と重ならない。
+        """
+        low, high = self._bounds(low, high)
+        overlap = (self.maxs >= low) & (self.mins <= high)
+        inside = overlap & (self.mins >= low) & (self.maxs <= high)
+        return np.flatnonzero(inside), np.flatnonzero(overlap & ~inside)
+
+    def stats(self, low, high):
+        """
+        範囲 [low, high] で調べるパーティションと行の数（explain 用）。
+        """
+        inside, partial = self.prune(low, high)
+        touched = np.concatenate([inside, partial])
+        return {
+            "partitions": len(self),
+            "inside": len(inside),
+            "partial": len(partial),
+            "skipped": len(self) - len(touched),
+            "rows_touched": int((self.starts[touched + 1] - self.starts[touched]).sum()),
+        }
+
+    def _parts(self, low, high):
+        """
+        日付が [low, high] に入る行番号の、パーティションごとの配列。
+        """
+        inside, partial = self.prune(low, high)
+        low, high = self._bounds(low, high)
+        parts = [self.rows[self.starts[i]:self.starts[i + 1]] for i in inside]
+        for i in partial:
+            start, stop = self.starts[i], self.starts[i + 1]
+            dates = self.dates[start:stop]
+            parts.append(self.rows[start:stop][(dates >= low) & (dates <= high)])
+        return parts
+
+    def count(self, low, high):
+        return int(sum(len(part) for part in self._parts(low, high)))
+
+    def select(self, low, high) -> RowSet:
+        """
+        日付が [low, high] に入る行（欠損は入らない）。
+        """
+        parts = self._parts(low, high)
+        rows = np.sort(np.concatenate(parts)) if parts else self.rows[:0]
+        if len(rows) <= self.n * DENSE_RATIO:
+            return RowSet(self.n, rows=rows)
+        return RowSet(self.n, bits=_pack(rows, self.n))
+
+    def append(self, series: pd.Series, offset) -> "DatePartitionIndex":
+        """
+        offset 行目から series の行を足したインデックス（行の追記用）。
+        並べるのは追記分だけで、月ごとにまとめた追記分の行を各月のパーティションの後ろに
+        差し込み、差し込んだ月の統計（最小・最大）だけを更新する。
+        """
+        delta = DatePartitionIndex.build(series, offset=offset)
+        dates = delta.dates.astype(self.dates.dtype)
+        sizes = np.diff(delta.starts)
+
+        # 追記分のパーティションを差し込む位置：同じ月の既存のパーティションの末尾
+        # （その月が無ければ次の月の先頭）
+        at = self.starts[np.searchsorted(self.keys, delta.keys, side="right")]
+        at = np.repeat(at, sizes)
+        rows = np.insert(self.rows, at, delta.rows)
+        dates = np.insert(self.dates, at, dates)
+
+        # パーティションの月・境界・統計（月の数だけの配列なので全部作り直しても軽い）
+        keys = np.union1d(self.keys, delta.keys)
+        old, new = np.searchsorted(keys, self.keys), np.searchsorted(keys, delta.keys)
+        counts = np.zeros(len(keys), dtype=np.int64)
+        counts[old] += np.diff(self.starts)
+        counts[new] += sizes
+        starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # 欠損（NaT）は fmin / fmax で無視されるので、新しい月は追記分の値になる
+        mins = np.full(len(keys), np.datetime64("NaT"), dtype=self.dates.dtype)
+        maxs = mins.copy()
+        mins[old], maxs[old] = self.mins, self.maxs
+        mins[new] = np.fmin(mins[new], delta.mins.astype(self.dates.dtype))
+        maxs[new] = np.fmax(maxs[new], delta.maxs.astype(self.dates.dtype))
+        return DatePartitionIndex(delta.n, rows, dates, keys, starts, mins, maxs)
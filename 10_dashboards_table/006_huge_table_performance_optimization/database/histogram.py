@@ -0,0 +1,176 @@
+# database/histogram.py
+"""
+数値・日付列の等幅ヒストグラム（範囲フィルタの行数の見積もり・スライダーの分布表示用）。
+
+範囲 [low, high] に入る行数は、完全に含まれるビンの件数と、
+端のビンの件数をビン内で一様とみなして按分したものの和で見積もる（O(ビン数)）。
+
+BinnedColumn は各行のビン番号を持っておき、絞り込んだ行のヒストグラムを
+値を見ずにビン番号の数え上げ（np.bincount）だけで作る。
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 64
+
+
+class Histogram:
+    """
+    - edges : ビンの境界（len = ビン数 + 1）
+    - counts: ビンごとの件数（欠損は数えない）
+    - unit  : 日付列なら datetime64 の単位（"us" など）、数値列なら None
+    """
+
+    def __init__(self, edges, counts, unit=None):
+        self.edges = edges
+        self.counts = counts
+        self.unit = unit
+
+    @classmethod
+    def build(cls, values, bins=DEFAULT_BINS):
+        values, unit = _as_float(values)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return cls(np.array([0.0, 1.0]), np.zeros(1, dtype=np.int64), unit)
+        counts, edges = np.histogram(values, bins=bins)
+        return cls(edges, counts.astype(np.int64), unit)
+
+    @classmethod
+    def from_bounds(cls, low, high, bins=DEFAULT_BINS):
+        """
+        値の (min, max) だけから作った空のヒストグラム（ビンは build() で作るものと同じ）。
+        値を持たないクエリのバックエンドで、count() と組み合わせて使う。
+        """
+        if low is None:
+            return cls(np.array([0.0, 1.0]), np.zeros(1, dtype=np.int64))
+        edges = np.histogram_bin_edges(np.array([low, high], dtype=np.float64), bins=bins)
+        return cls(edges, np.zeros(bins, dtype=np.int64))
+
+    def count(self, values) -> "Histogram":
+        """
+        values を同じビンで数えたヒストグラム（範囲外の値は端のビン、欠損は数えない）。
+        """
+        codes = self.bin_codes(values)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.counts))
+        return Histogram(self.edges, counts.astype(np.int64), self.unit)
+
+    def spacing(self):
+        """
+        等幅のビンの (始点, 幅)。i 番目の境界は i * 幅 + 始点（np.histogram_bin_edges の
+        np.linspace と同じ計算なので、float64 で計算すれば edges とぴったり同じ値になる）。
+        クエリのバックエンドが、値を取り出さずにエンジンの中でビン番号を求めるのに使う。
+        """
+        start = float(self.edges[0])
+        return start, (float(self.edges[-1]) - start) / len(self.counts)
+
+    def from_codes(self, codes, counts) -> "Histogram":
+        """
+        ビン番号ごとの件数（エンジンで GROUP BY したもの）から作った、同じビンのヒストグラム。
+        範囲外のビン番号は端のビンに入れる（count() と同じ）。
+        """
+        codes = np.clip(np.asarray(codes, dtype=np.int64), 0, len(self.counts) - 1)
+        counts = np.bincount(codes, weights=np.asarray(counts, dtype=np.float64),
+                             minlength=len(self.counts))
+        return Histogram(self.edges, counts.astype(np.int64), self.unit)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def _position(self, value):
+        if self.unit is not None:
+            value = np.datetime64(value).astype(f"datetime64[{self.unit}]").astype(np.int64)
+        return float(value)
+
+    def estimate(self, low, high):
+        """
+        値が [low, high] に入る行数の見積もり。
+        """
+        low, high = self._position(low), self._position(high)
+        if high < low:
+            return 0
+        edges = self.edges
+        widths = np.diff(edges)
+        # 各ビンのうち [low, high] に重なる割合（幅 0 のビンは中にあれば全部）
+        overlap = np.clip(np.minimum(edges[1:], high) - np.maximum(edges[:-1], low), 0, None)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(widths > 0, overlap / widths,
+                             ((edges[:-1] >= low) & (edges[:-1] <= high)).astype(float))
+        return int(round(float((self.counts * ratio).sum())))
+
+    def append(self, values) -> "Histogram":
+        """
+        values を足したヒストグラム（行の追記用）。ビンはそのままで、範囲外の値は端のビンに入れる。
+        """
+        values, _ = _as_float(values)
+        values = values[~np.isnan(values)]
+        bins = np.clip(np.searchsorted(self.edges, values, side="right") - 1,
+                       0, len(self.counts) - 1)
+        counts = self.counts + np.bincount(bins, minlength=len(self.counts))
+        return Histogram(self.edges, counts, self.unit)
+
+    def bin_codes(self, values):
+        """
+        values の各値が入るビンの番号（int16。範囲外の値は端のビン、欠損は -1）。
+        """
+        values, _ = _as_float(values)
+        codes = np.clip(np.searchsorted(self.edges, values, side="right") - 1,
+                        0, len(self.counts) - 1).astype(np.int16)
+        codes[np.isnan(values)] = -1
+        return codes
+
+    def to_dict(self):
+        """
+        dcc.Store に入れる形（{"edges": [...], "counts": [...]}。日付列は使わない）。
+        """
+        return {"edges": self.edges.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(np.asarray(data["edges"], dtype=np.float64),
+                   np.asarray(data["counts"], dtype=np.int64))
+
+
+class BinnedColumn:
+    """
+    列のヒストグラム（全行）+ 各行のビン番号（行の並びは Dataset.df と同じ）。
+    """
+
+    def __init__(self, histogram: Histogram, codes):
+        self.histogram = histogram
+        self.codes = codes
+
+    @classmethod
+    def build(cls, histogram: Histogram, values):
+        return cls(histogram, histogram.bin_codes(values))
+
+    def subset(self, positions) -> Histogram:
+        """
+        行位置 positions の行だけのヒストグラム（ビンは全行のものと同じ）。
+        """
+        codes = self.codes[positions]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.histogram.counts))
+        return Histogram(self.histogram.edges, counts.astype(np.int64), self.histogram.unit)
+
+    def append(self, values) -> "BinnedColumn":
+        """
+        values の行を末尾に足したもの（行の追記用。ビンはそのまま）。
+        """
+        return BinnedColumn(
+            self.histogram.append(values),
+            np.concatenate([self.codes, self.histogram.bin_codes(values)]),
+        )
+
+
+def _as_float(values):
+    """
+    Series / 配列を float64 の配列にする（日付は datetime64 の整数値。欠損は NaN）。
+    """
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            unit = np.datetime_data(values.dtype)[0]
+            ints = values.to_numpy().astype(np.int64).astype(np.float64)
+            ints[values.isna().to_numpy()] = np.nan
+            return ints, unit
+        values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64), None
@@ -0,0 +1,80 @@
+# database/ingest.py
+"""
+追記のみの差分取り込み。
+
+毎日の追加分（CSV or DataFrame）を、ファイル全体を読み直さずに
+読み込み済みのテーブルへ追記する。
+- 差分はスキーマ（database/schema.py）で型変換してから追記
+- ユニーク日付・選択肢・件数・min/max などは差分だけで更新
+  （日付スライダーの範囲も dataset-version 経由で広がる）
+- 追記後は新しい版に差し替わるので、版に紐づくキャッシュは無効になる
+
+    from database.ingest import ingest_rows
+    ingest_rows("database/delta_20250101.csv")
+
+外部のフィードから流し込む場合は register_ingest_route() で
+POST /ingest/<dataset_name>（本文が CSV）を受け付ける。
+"""
+import io
+from pathlib import Path
+
+import pandas as pd
+
+from database.registry import get_registry
+from database.schema import apply_schema
+
+
+def read_delta(delta) -> pd.DataFrame:
+    """
+    CSV のパス or DataFrame を、スキーマ変換済みの DataFrame にする。
+    """
+    if isinstance(delta, pd.DataFrame):
+        raw = delta
+    else:
+        raw = pd.read_csv(Path(delta))
+    return apply_schema(raw.reset_index(drop=True))
+
+
+def ingest_rows(delta, dataset_name=None, registry=None):
+    """
+    差分を追記し、新しい版の Dataset を返す。
+    """
+    registry = registry or get_registry()
+    rows = read_delta(delta)
+    if len(rows) == 0:
+        return registry.get(dataset_name)
+
+    dataset = registry.append(dataset_name, rows)
+    print(
+        f"[dataset] appended {len(rows):,} rows to "
+        f"{registry.resolve(dataset_name)} (now {len(dataset):,} rows)"
+    )
+    return dataset
+
+
+def register_ingest_route(server):
+    """
+    Flask サーバに POST /ingest/<dataset_name> を追加する（本文は CSV、ヘッダー行付き）。
+    認証は無いので、社内ネットワークなど閉じた環境でだけ有効にすること。
+    追記はメモリ上の Dataset にだけ入るので、QUERY_BACKEND が pandas 以外のときは
+    （テーブルに出ないまま版だけ進んでしまうので）409 で断る。
+    """
+    from flask import jsonify, request
+
+    from utils import constants
+
+    @server.route("/ingest/<dataset_name>", methods=["POST"])
+    def ingest_endpoint(dataset_name):
+        registry = get_registry()
+        if dataset_name not in registry.names():
+            return jsonify({"error": f"unknown dataset: {dataset_name}"}), 404
+        if constants.QUERY_BACKEND != "pandas":
+            return jsonify({
+                "error": f"ingest is not supported with QUERY_BACKEND={constants.QUERY_BACKEND!r}"
+            }), 409
+        try:
+            delta = pd.read_csv(io.BytesIO(request.get_data()))
+            dataset = ingest_rows(delta, dataset_name=dataset_name, registry=registry)
+        except (ValueError, pd.errors.ParserError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"rows": len(dataset), "version": dataset.version})
@@ -0,0 +1,460 @@
+# database/mixed.py
+"""
+mixed_* 列（数値 or 文字列が混ざった列）の型付き表現。
+
+文字列のままだとソートが辞書順（"10.5" が "9.1" より前）になり、比較も 1 値ずつ
+Python オブジェクトで行うことになる。ここでは列を読み込み時に次の 2 つの配列に分け、
+DataFrame の列そのものとして持つ（pandas の ExtensionArray。database/schema.apply_schema で変換）。
+
+- numbers: float32。数値の行だけ値が入る（それ以外は NaN）
+- texts  : 文字列の配列。文字列の行だけ値が入る（数値の行は欠損）。
+           ただし decimals 桁の表記に戻すと元の文字列にならない数値（"1.5" / "1e3" など）は
+           元の文字列も入れておき、表示はそちらを使う
+
+表示用の文字列に戻すのは、返すページの行だけ（decode() / database/schema.decode_page）。
+型タグ（MIXED_NULL / MIXED_NUMBER / MIXED_TEXT）とソートキー
+（数値（昇順）→ 文字列（辞書順）の順位。欠損は NaN）は、使うときに 1 回だけ作る。
+ソートは sort_key、数値の範囲フィルタは numbers で NumPy のまま処理できる。
+
+Parquet / Arrow のキャッシュには struct<number: float32, text: string> の
+拡張型（MixedArrowType）で書くので、キャッシュから読むときは文字列をパースし直さない。
+"""
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import (
+    ExtensionArray,
+    ExtensionDtype,
+    register_extension_dtype,
+    take,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:   # pyarrow が無ければキャッシュに書かない（dataset_loader が CSV を読む）
+    pa = None
+
+MIXED_NULL = 0
+MIXED_NUMBER = 1
+MIXED_TEXT = 2
+
+# Arrow の拡張型の名前（キャッシュのスキーマに入る）
+ARROW_EXTENSION_NAME = "dashboard.mixed"
+
+
+def _text_dtype():
+    # pandas の arrow 文字列（StringDtype("pyarrow")）はオフセットが 64 bit（large_string）なので、
+    # 32 bit オフセットの string で持つ（200,000 行で 1 列 0.8 MB 小さい）
+    if pa is None:
+        return pd.StringDtype("python")
+    return pd.ArrowDtype(pa.string())
+
+
+# pd.to_numeric が数値として読む表記（前後の空白可）。inf / nan は有限でないので文字列のまま
+_NUMBER_PATTERN = r"^\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*$"
+
+# 整数で表記を組み立てる桁数の上限（float64 で誤差なく表せる 15 桁まで）
+_EXACT_DIGITS = 15
+
+
+def _format(numbers, decimals):
+    """
+    数値（float32）を decimals 桁の表記（CSV と同じ f"{v:.2f}"）にした object 配列。
+
+    float32 に 10 ** decimals を掛けた値は float64 で誤差なく表せるので、NumPy で整数に丸めて
+    （偶数丸め。f-string と同じ）Arrow で「符号 + 整数部 + "." + 小数部」の文字列にする。
+    桁数が多すぎる値だけ f-string で作る。
+    """
+    values = numbers.astype(np.float64)
+    if pa is None or decimals > _EXACT_DIGITS // 2:
+        return np.array([f"{v:.{decimals}f}" for v in values], dtype=object)
+
+    scale = 10 ** decimals
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = np.abs(np.rint(values * scale))
+    exact = scaled < 10.0 ** _EXACT_DIGITS
+    out = np.empty(len(values), dtype=object)
+
+    whole, fraction = np.divmod(scaled[exact].astype(np.int64), scale)
+    text = pc.cast(pa.array(whole), pa.string())
+    if decimals:
+        fraction = pc.utf8_lpad(pc.cast(pa.array(fraction), pa.string()), decimals, "0")
+        text = pc.binary_join_element_wise(text, fraction, ".")
+    sign = pc.if_else(pa.array(np.signbit(values[exact])), "-", "")
+    out[exact] = pc.binary_join_element_wise(sign, text, "").to_numpy(zero_copy_only=False)
+
+    for i in np.flatnonzero(~exact):
+        out[i] = f"{values[i]:.{decimals}f}"
+    return out
+
+
+def _arrow_strings(scalars):
+    """
+    scalars を Arrow の string 配列にする（欠損は null）。pyarrow が無い・文字列以外の値が
+    混ざっているときは None（呼び出し元は 1 値ずつパースする）。
+    """
+    if pa is None:
+        return None
+    if isinstance(scalars, pd.Series):
+        scalars = scalars.array
+    try:
+        return pa.array(scalars, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+
+def _canonical_mask(strings, numbers, decimals):
+    """
+    数値の行（numbers が有限）のうち、decimals 桁の表記に戻すと元の文字列と同じになる行の bool 配列。
+
+    表記の形（"-123.45"）に合う文字列だけが候補で、"." を除いた整数と
+    rint(数値 * 10 ** decimals) を比べる（_format と同じく誤差なく比べられる）。
+    形は合うが桁数が多すぎる値だけ _format で作って比べる。
+    """
+    fraction = rf"\.\d{{{decimals}}}" if decimals else ""
+    is_number = np.isfinite(numbers)
+    same = np.zeros(len(strings), dtype=bool)
+
+    short = np.zeros(len(strings), dtype=bool)
+    if decimals <= _EXACT_DIGITS // 2:
+        pattern = rf"^-?(?:0|[1-9]\d{{0,{_EXACT_DIGITS - decimals - 1}}}){fraction}$"
+        short = pc.fill_null(pc.match_substring_regex(strings, pattern), False)
+        short = short.to_numpy(zero_copy_only=False)
+    rows = np.flatnonzero(is_number & short)
+    if len(rows):
+        digits = pc.replace_substring(strings.take(pa.array(rows)), ".", "")
+        digits = pc.cast(digits, pa.int64()).to_numpy(zero_copy_only=False)
+        with np.errstate(invalid="ignore", over="ignore"):
+            scaled = np.rint(numbers[rows].astype(np.float64) * 10 ** decimals)
+        same[rows] = digits.astype(np.float64) == scaled
+
+    rows = np.flatnonzero(is_number & ~short)
+    if len(rows):
+        original = strings.take(pa.array(rows))
+        long = pc.match_substring_regex(original, rf"^-?[1-9]\d*{fraction}$").to_numpy(zero_copy_only=False)
+        rows, original = rows[long], original.filter(pa.array(long)).to_numpy(zero_copy_only=False)
+        same[rows] = _format(numbers[rows], decimals) == original
+    return same
+
+
+@register_extension_dtype
+class MixedDtype(ExtensionDtype):
+    """
+    mixed 列の型（"mixed[2]" のように表示桁数を持つ）。
+    """
+
+    type = str
+    kind = "O"
+    _metadata = ("decimals",)
+
+    def __init__(self, decimals=2):
+        self.decimals = int(decimals)
+
+    @property
+    def name(self):
+        return f"mixed[{self.decimals}]"
+
+    @classmethod
+    def construct_from_string(cls, string):
+        if not isinstance(string, str):
+            raise TypeError(f"'construct_from_string' expects a string, got {type(string)}")
+        match = re.fullmatch(r"mixed(?:\[(\d+)\])?", string)
+        if match is None:
+            raise TypeError(f"Cannot construct a 'MixedDtype' from '{string}'")
+        return cls(match.group(1) or 2)
+
+    @classmethod
+    def construct_array_type(cls):
+        return MixedArray
+
+    def __from_arrow__(self, array):
+        """
+        キャッシュ（struct<number, text>）から読んだ Arrow の配列 → MixedArray（パースしない）。
+        """
+        chunks = array.chunks if isinstance(array, pa.ChunkedArray) else [array]
+        chunks = [c.storage if isinstance(c, pa.ExtensionArray) else c for c in chunks]
+        if not chunks:
+            return MixedArray._empty(self)
+        struct = pa.concat_arrays(chunks) if len(chunks) > 1 else chunks[0]
+        numbers, texts = struct.flatten()
+        numbers = numbers.to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+        return MixedArray(numbers, pd.array(texts, dtype=_text_dtype()), self)
+
+
+class MixedArray(ExtensionArray):
+    """
+    mixed 列の値（numbers: float32 + texts: 文字列）。行の並びは DataFrame と同じ。
+    """
+
+    def __init__(self, numbers, texts, dtype=None):
+        self.numbers = numbers
+        self.texts = texts
+        self._dtype = dtype or MixedDtype()
+        self._tags = None
+        self._sort_key = None
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @classmethod
+    def _empty(cls, dtype):
+        return cls(np.empty(0, dtype=np.float32), pd.array([], dtype=_text_dtype()), dtype)
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        """
+        文字列（or 数値）の並び → MixedArray。
+        数値として読めて有限な値は数値、それ以外の非欠損値は文字列として扱う。
+        """
+        dtype = dtype if isinstance(dtype, MixedDtype) else MixedDtype()
+        if isinstance(scalars, MixedArray):
+            return scalars.copy() if copy else scalars
+
+        strings = _arrow_strings(scalars)
+        if strings is not None:
+            return cls._from_arrow_strings(strings, dtype)
+
+        values = pd.Series(scalars, copy=False).astype(object)
+        present = values.notna().to_numpy()
+        parsed = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        is_number = present & np.isfinite(parsed)
+        numbers = np.where(is_number, parsed, np.nan).astype(np.float32)
+
+        # 表記に戻して元の文字列にならない数値は、元の文字列も持っておく
+        original = values.to_numpy()
+        keep_text = present & ~is_number
+        is_str = np.fromiter((isinstance(v, str) for v in original), dtype=bool, count=len(original))
+        check = np.flatnonzero(is_number & is_str)
+        if len(check):
+            keep_text[check] = _format(numbers[check], dtype.decimals) != original[check]
+
+        texts = np.where(keep_text, original, None)
+        return cls(numbers, pd.array(texts, dtype=_text_dtype()), dtype)
+
+    @classmethod
+    def _from_arrow_strings(cls, strings, dtype):
+        """
+        Arrow の string 配列 → MixedArray（CSV から読んだ列。パースも表記の確認も列ごとにまとめて行う）。
+        """
+        if isinstance(strings, pa.ChunkedArray):
+            strings = strings.combine_chunks()
+        candidate = pc.match_substring_regex(strings, _NUMBER_PATTERN)
+        parsed = pc.cast(pc.utf8_trim_whitespace(pc.if_else(candidate, strings, None)), pa.float64())
+        parsed = parsed.to_numpy(zero_copy_only=False)
+        numbers = np.where(np.isfinite(parsed), parsed, np.nan).astype(np.float32)
+
+        # 表記に戻して元の文字列にならない数値は、元の文字列も持っておく
+        keep_text = strings.is_valid().to_numpy(zero_copy_only=False)
+        keep_text &= ~_canonical_mask(strings, numbers, dtype.decimals)
+        texts = pc.if_else(pa.array(keep_text), strings, None)
+        return cls(numbers, pd.array(texts, dtype=_text_dtype()), dtype)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls._from_sequence(values, dtype=original.dtype)
+
+    # ------------------------------------------------------------
+    # 分割済みの値
+    # ------------------------------------------------------------
+    @property
+    def tags(self):
+        if self._tags is None:
+            tags = np.full(len(self), MIXED_NULL, dtype=np.int8)
+            tags[~self.texts.isna()] = MIXED_TEXT
+            tags[~np.isnan(self.numbers)] = MIXED_NUMBER
+            self._tags = tags
+        return self._tags
+
+    @property
+    def is_number(self):
+        return self.tags == MIXED_NUMBER
+
+    @property
+    def sort_key(self):
+        """
+        数値 → 文字列の順に並ぶ順位（同じ値は同じ順位）。欠損は NaN。
+        """
+        if self._sort_key is None:
+            tags = self.tags
+            key = np.full(len(self), np.nan)
+
+            is_number = tags == MIXED_NUMBER
+            distinct, ranks = np.unique(self.numbers[is_number], return_inverse=True)
+            key[is_number] = ranks
+
+            is_text = np.flatnonzero(tags == MIXED_TEXT)
+            _, text_ranks = np.unique(self.text_values(is_text), return_inverse=True)
+            key[is_text] = len(distinct) + text_ranks
+            self._sort_key = key
+        return self._sort_key
+
+    def text_values(self, rows):
+        """
+        rows（行位置の配列）の文字列の値の object 配列（文字列の行用）。
+        """
+        return self.texts.take(rows).to_numpy(dtype=object, na_value=None)
+
+    def number_range_mask(self, low, high, rows=slice(None)):
+        """
+        数値部分が [low, high] に入る行の bool 配列（文字列・欠損の行は False）。
+        rows を渡すとその行（行位置の配列 / slice）だけを調べる。
+        境界値も float32 にそろえて比較する（丸め誤差で端が落ちないように）。
+        """
+        numbers = self.numbers[rows]
+        with np.errstate(invalid="ignore"):
+            return (numbers >= np.float32(low)) & (numbers <= np.float32(high))
+
+    def number_bounds(self):
+        """
+        数値部分の (min, max)。数値の行が無ければ None。
+        """
+        numbers = self.numbers[~np.isnan(self.numbers)]
+        if len(numbers) == 0:
+            return None
+        return float(numbers.min()), float(numbers.max())
+
+    def decode(self, rows=None, na_value=None):
+        """
+        表示用の文字列の object 配列（rows を渡すとその行だけ。欠損は na_value）。
+        """
+        numbers = self.numbers if rows is None else self.numbers[rows]
+        texts = self.texts if rows is None else self.texts.take(rows)
+        out = texts.to_numpy(dtype=object, na_value=None)
+        plain = texts.isna() & ~np.isnan(numbers)
+        out[plain] = _format(numbers[plain], self.dtype.decimals)
+        if na_value is not None:
+            out[texts.isna() & np.isnan(numbers)] = na_value
+        return out
+
+    # ------------------------------------------------------------
+    # ExtensionArray
+    # ------------------------------------------------------------
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            value = self.decode(np.array([item]))[0]
+            return self.dtype.na_value if value is None else value
+        item = pd.api.indexers.check_array_indexer(self, item)
+        return MixedArray(self.numbers[item], self.texts[item], self.dtype)
+
+    def __iter__(self):
+        return iter(self.decode(na_value=self.dtype.na_value))
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.decode(), dtype=dtype)
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        return self.decode() == (other.decode() if isinstance(other, MixedArray) else other)
+
+    @property
+    def nbytes(self):
+        return self.numbers.nbytes + self.texts.nbytes
+
+    def isna(self):
+        return np.isnan(self.numbers) & self.texts.isna()
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        numbers = take(self.numbers, indices, allow_fill=allow_fill, fill_value=np.nan)
+        texts = self.texts.take(indices, allow_fill=allow_fill)
+        return MixedArray(numbers, texts, self.dtype)
+
+    def copy(self):
+        return MixedArray(self.numbers.copy(), self.texts.copy(), self.dtype)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        to_concat = list(to_concat)
+        texts = type(to_concat[0].texts)._concat_same_type([a.texts for a in to_concat])
+        numbers = np.concatenate([a.numbers for a in to_concat])
+        return cls(numbers, texts, to_concat[0].dtype)
+
+    def astype(self, dtype, copy=True):
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, MixedDtype):
+            return self.copy() if copy else self
+        if isinstance(dtype, ExtensionDtype):
+            return dtype.construct_array_type()._from_sequence(self.decode(), dtype=dtype)
+        if dtype.kind == "U":
+            return pd.array(self.decode(), dtype=pd.StringDtype(na_value=np.nan))
+        return np.asarray(self.decode(), dtype=dtype)
+
+    def _values_for_factorize(self):
+        return self.decode(na_value=np.nan), np.nan
+
+    def _values_for_argsort(self):
+        return self.sort_key
+
+    def value_counts(self, dropna=True):
+        """
+        値ごとの件数（数値は数値のまま数えて、値の種類だけを表記に戻す）。
+        """
+        plain = self.texts.isna() & ~np.isnan(self.numbers)
+        distinct, counts = np.unique(self.numbers[plain], return_counts=True)
+        texts = self.texts.value_counts(dropna=True)
+        index = [*_format(distinct, self.dtype.decimals), *texts.index.astype(object)]
+        values = [*counts, *texts.to_numpy()]
+        if not dropna:
+            missing = int(self.isna().sum())
+            if missing:
+                index.append(self.dtype.na_value)
+                values.append(missing)
+        result = pd.Series(np.asarray(values, dtype=np.int64), index=pd.Index(index, dtype=object))
+        return result.sort_values(ascending=False, kind="stable").rename("count")
+
+    def __arrow_array__(self, type=None):
+        storage = pa.StructArray.from_arrays(
+            [
+                pa.array(self.numbers, mask=np.isnan(self.numbers), type=pa.float32()),
+                pa.array(self.texts, type=pa.string()),
+            ],
+            names=["number", "text"],
+        )
+        return pa.ExtensionArray.from_storage(MixedArrowType(self.dtype.decimals), storage)
+
+
+if pa is not None:
+
+    class MixedArrowType(pa.ExtensionType):
+        """
+        キャッシュ（Parquet / Arrow IPC）に書く mixed 列の型：struct<number: float32, text: string>。
+        """
+
+        def __init__(self, decimals=2):
+            self.decimals = int(decimals)
+            storage = pa.struct([("number", pa.float32()), ("text", pa.string())])
+            super().__init__(storage, ARROW_EXTENSION_NAME)
+
+        def __arrow_ext_serialize__(self):
+            return json.dumps({"decimals": self.decimals}).encode()
+
+        @classmethod
+        def __arrow_ext_deserialize__(cls, storage_type, serialized):
+            return cls(json.loads(serialized.decode())["decimals"])
+
+        def __reduce__(self):
+            return MixedArrowType, (self.decimals,)
+
+        def to_pandas_dtype(self):
+            return MixedDtype(self.decimals)
+
+    try:
+        pa.register_extension_type(MixedArrowType())
+    except pa.ArrowKeyError:   # 読み込み直し（importlib.reload など）で登録済み
+        pass
+
+
+def split_mixed(series: pd.Series, decimals=2) -> MixedArray:
+    """
+    mixed 列を数値部分と文字列部分に分ける（既に分けてあればその配列をそのまま返す）。
+    """
+    if isinstance(series.dtype, MixedDtype):
+        return series.array
+    return MixedArray._from_sequence(series, dtype=MixedDtype(decimals))
@@ -0,0 +1,576 @@
+# database/queries_csv.py
+"""
+テーブルのクエリを組み込みの SQL エンジンで実行するバックエンド
+（utils/constants.QUERY_BACKEND = "sql" のとき utils/query_backend.py から使う）。
+
+pandas の経路（utils/filtering.py）はデータセットをメモリ上の DataFrame に載せて絞り込む。
+ここではデータセットをプロセス内の SQL エンジンに読み込んでおき、
+filters-state / sort_by / page_current / page_size を 1 本の SQL
+（WHERE + ORDER BY + LIMIT / OFFSET）にして、返すページの行だけを受け取る。
+チェックリストの選択肢（ファセット）は GROUP BY で求める。
+全文検索は列の値の種類から作った転置インデックス（database/token_index.py）で
+一致する値を求め、値の IN にする。
+
+- DuckDB があれば DuckDB（列指向キャッシュの Parquet をメモリ上のテーブルに読み込む。
+  mixed_* はキャッシュでは数値 + 文字列の組なので、表示用の文字列と数値部分の列に分けて入れる）
+- 無ければ SQLite（database/.cache/<CSV 名>.sqlite に書き出し、フィルタ列に索引を張る。
+  ファイルは列指向キャッシュと同じく CSV のサイズ / mtime / ハッシュで紐付ける）
+- CSV が書き換わったら次のクエリで読み込み直す
+  （/ingest の追記はメモリ上の Dataset にだけ入るので、この経路では /ingest は 409 で断る）
+
+並び順は pandas の経路とそろえる（欠損は最後、mixed_* は数値 → 文字列、同順位は元の行順）。
+
+    from database.queries_csv import get_query_backend
+    rows = get_query_backend("test_output_200000.csv").page(state, sort_by, 0, 100)
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from database.backend_pool import BackendPool
+from database.dataset_loader import (
+    _cache_lock,
+    _cache_paths,
+    _is_cache_fresh,
+    _write_meta,
+    ensure_cache,
+    iter_typed_chunks,
+)
+from database.histogram import Histogram
+from database.schema import SCHEMA, apply_schema, decode_page
+from database.token_index import TokenIndex
+from database.watcher import BackgroundReloader
+from utils.constants import SQL_ENGINE
+from utils.filtering import (
+    CHECKBOX_FILTER_MAP,
+    DATE_FILTER_MAP,
+    MIXED_RANGE_FILTER_MAP,
+    RANGE_FILTER_MAP,
+    SEARCH_FILTER_MAP,
+    TEXT_FILTER_MAP,
+    canonical_state,
+)
+
+TABLE = "dataset"
+# 元の行番号（並びの最後のキーにして、同順位の行を pandas の経路と同じ順にする）
+ROW_COLUMN = "_row"
+# mixed_* の数値部分は別の列に持つ（"mixed_1__num"）
+NUMBER_SUFFIX = "__num"
+
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+def _has_duckdb():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _kind(col):
+    return SCHEMA.get(col, {}).get("kind")
+
+
+class _DuckDBEngine:
+    """
+    DuckDB（メモリ上）。列指向キャッシュの Parquet をテーブルに読み込む。
+    """
+
+    name = "duckdb"
+
+    def __init__(self, csv_path, verbose=True):
+        import duckdb
+
+        cache_path = ensure_cache(csv_path, "parquet", verbose=verbose)
+        source = "read_parquet('" + str(cache_path).replace("'", "''") + "', file_row_number = true)"
+        self.conn = duckdb.connect()
+        names = [
+            row[0] for row in self.conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+            if row[0] != "file_row_number"
+        ]
+        self.conn.execute(
+            f"CREATE TABLE {TABLE} AS "
+            f"SELECT {', '.join(_duckdb_select(c) for c in names)}, file_row_number AS {ROW_COLUMN} "
+            f"FROM {source}"
+        )
+        self.columns = [
+            row[0] for row in self.conn.execute(f"DESCRIBE {TABLE}").fetchall()
+            if row[0] != ROW_COLUMN and not row[0].endswith(NUMBER_SUFFIX)
+        ]
+
+    def number(self, col):
+        return _quote(col + NUMBER_SUFFIX)
+
+    def quantity_bounds(self, low, high):
+        # float32 の列は境界値も float32 にそろえて比較する
+        return "CAST(? AS FLOAT)", "CAST(? AS FLOAT)", [float(low), float(high)]
+
+    def number_bounds(self, low, high):
+        return self.quantity_bounds(low, high)
+
+    def date_bounds(self, low, high):
+        return "CAST(? AS TIMESTAMP)", "CAST(? AS TIMESTAMP)", [
+            low.to_pydatetime(), high.to_pydatetime()
+        ]
+
+    def day(self, col):
+        return f"CAST({_quote(col)} AS DATE)"
+
+    def floor(self, expr):
+        return f"CAST(FLOOR({expr}) AS BIGINT)"
+
+    def frame(self, sql, params):
+        return self.conn.execute(sql, params).df()
+
+    def rows(self, sql, params):
+        return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _duckdb_select(col):
+    """
+    Parquet の列 → テーブルの列の SELECT 式。mixed_* の struct<number, text> は
+    表示用の文字列（数値は decimals 桁の表記）と数値部分（<列名>__num、float32）に分ける。
+    """
+    quoted = _quote(col)
+    if _kind(col) != "mixed":
+        return quoted
+    decimals = SCHEMA[col]["decimals"]
+    text = f"COALESCE({quoted}.text, CAST(CAST({quoted}.number AS DECIMAL(18, {decimals})) AS VARCHAR))"
+    return f"{text} AS {quoted}, {quoted}.number AS {_quote(col + NUMBER_SUFFIX)}"
+
+
+class _SQLiteEngine:
+    """
+    SQLite（database/.cache/<CSV 名>.sqlite）。
+    - date は "YYYY-MM-DD" の文字列、quantity_* は decimals 桁で丸めた REAL で持つ
+    - mixed_* は表示用の文字列で持ち、数値部分を <列名>__num に持つ
+    - チェックリスト・範囲フィルタの列に索引を張る
+    """
+
+    name = "sqlite"
+
+    def __init__(self, csv_path, verbose=True):
+        csv_path = Path(csv_path)
+        db_path, meta_path = _cache_paths(csv_path, "sqlite")
+        with _cache_lock(db_path):
+            fresh, digest = _is_cache_fresh(csv_path, db_path, meta_path)
+            if not fresh:
+                rows, columns = _write_sqlite(csv_path, db_path, verbose=verbose)
+                _write_meta(csv_path, meta_path, rows, columns, digest)
+
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.columns = [
+            row[1] for row in self.conn.execute(f"PRAGMA table_info({TABLE})")
+            if row[1] != ROW_COLUMN and not row[1].endswith(NUMBER_SUFFIX)
+        ]
+
+    def number(self, col):
+        return _quote(col + NUMBER_SUFFIX)
+
+    def quantity_bounds(self, low, high):
+        return "?", "?", [float(low), float(high)]
+
+    def number_bounds(self, low, high):
+        # mixed_* の数値部分は float32 の値なので、境界値も float32 に丸めてから比べる
+        return "?", "?", [float(np.float32(low)), float(np.float32(high))]
+
+    def date_bounds(self, low, high):
+        return "?", "?", [low.strftime(_DATE_FORMAT), high.strftime(_DATE_FORMAT)]
+
+    def day(self, col):
+        return _quote(col)
+
+    def floor(self, expr):
+        # FLOOR は数学関数を有効にしたビルドにしか無いので整数への切り捨てで代える
+        # （負の値で 1 ずれても、呼び出し元が境界と比べて直す）
+        return f"CAST({expr} AS INTEGER)"
+
+    def frame(self, sql, params):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def rows(self, sql, params):
+        return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _sqlite_columns(typed, offset):
+    """
+    型変換済みのチャンクを、SQLite に入れる列ごとの値のリスト {列名: [...]} にする（欠損は None）。
+    """
+    out = {ROW_COLUMN: list(range(offset, offset + len(typed)))}
+    for col in typed.columns:
+        s = typed[col]
+        kind = _kind(col)
+        if kind == "date":
+            s = s.dt.strftime(_DATE_FORMAT)
+        elif kind == "quantity":
+            s = s.astype(np.float64).round(SCHEMA[col]["decimals"])
+        out[col] = _to_list(s)
+        if kind == "mixed":
+            # float32 の値をそのまま（丸めずに）入れる。範囲・min/max を pandas の経路とそろえるため
+            out[col + NUMBER_SUFFIX] = _to_list(pd.Series(s.array.numbers).astype(np.float64))
+    return out
+
+
+def _to_list(s):
+    values = s.to_numpy(dtype=object)
+    values[s.isna().to_numpy()] = None
+    return values.tolist()
+
+
+def _sqlite_type(col):
+    if col == ROW_COLUMN:
+        return "INTEGER PRIMARY KEY"
+    if col.endswith(NUMBER_SUFFIX) or _kind(col) == "quantity":
+        return "REAL"
+    return "TEXT"
+
+
+def _write_sqlite(csv_path, db_path, verbose=True):
+    """
+    CSV をチャンクごとに型変換して SQLite のファイルに書き出し、フィルタ列に索引を張る。
+    一時ファイルに書いてから置き換える。
+    戻り値: (行数, 列名)
+    """
+    started = time.perf_counter()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(str(tmp_path))
+    rows = 0
+    columns = []
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for typed in iter_typed_chunks(csv_path):
+            values = _sqlite_columns(typed, rows)
+            if rows == 0:
+                columns = list(typed.columns)
+                definition = ", ".join(f"{_quote(c)} {_sqlite_type(c)}" for c in values)
+                conn.execute(f"CREATE TABLE {TABLE} ({definition})")
+            placeholders = ", ".join("?" * len(values))
+            conn.executemany(
+                f"INSERT INTO {TABLE} VALUES ({placeholders})", zip(*values.values())
+            )
+            rows += len(typed)
+
+        if not columns:   # 空の CSV（ヘッダーのみ）
+            columns = list(pd.read_csv(csv_path, nrows=0).columns)
+            names = [ROW_COLUMN, *columns]
+            names += [c + NUMBER_SUFFIX for c in columns if _kind(c) == "mixed"]
+            definition = ", ".join(f"{_quote(c)} {_sqlite_type(c)}" for c in names)
+            conn.execute(f"CREATE TABLE {TABLE} ({definition})")
+
+        indexed = [*CHECKBOX_FILTER_MAP.values(), *RANGE_FILTER_MAP.values(), *DATE_FILTER_MAP.values()]
+        indexed = [c for c in indexed if c in columns]
+        indexed += [c + NUMBER_SUFFIX for c in MIXED_RANGE_FILTER_MAP.values() if c in columns]
+        for col in indexed:
+            conn.execute(f"CREATE INDEX {_quote('idx_' + col)} ON {TABLE} ({_quote(col)})")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    tmp_path.replace(db_path)
+
+    if verbose:
+        elapsed = time.perf_counter() - started
+        print(f"[query] {csv_path.name}: wrote sqlite ({rows:,} rows) in {elapsed:.3f}s")
+    return rows, columns
+
+
+_ENGINES = {"duckdb": _DuckDBEngine, "sqlite": _SQLiteEngine}
+
+
+def _engine_name(engine):
+    if engine == "auto":
+        return "duckdb" if _has_duckdb() else "sqlite"
+    if engine not in _ENGINES:
+        raise ValueError(f"unknown SQL engine: {engine}")
+    return engine
+
+
+class SqlQueryBackend:
+    """
+    1 つのデータセット（CSV）を SQL エンジンに読み込んで、テーブル・選択肢のクエリを実行する。
+    接続は 1 本をロックで守って使う。
+    """
+
+    def __init__(self, csv_path, engine=SQL_ENGINE, verbose=True):
+        self.path = Path(csv_path)
+        self.engine_name = _engine_name(engine)
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._reloader = BackgroundReloader(self.path, self._open, on_swap=self._close_engine)
+
+    def _open(self):
+        started = time.perf_counter()
+        engine = _ENGINES[self.engine_name](self.path, verbose=self.verbose)
+        if self.verbose:
+            elapsed = time.perf_counter() - started
+            print(f"[query] {self.path.name}: opened {self.engine_name} in {elapsed:.3f}s")
+        return engine
+
+    def _close_engine(self, engine):
+        # 古い版を使っているクエリ（ロックを持っている）が終わってから閉じる
+        with self._lock:
+            engine.close()
+
+    def _current(self):
+        """
+        (読み込み済みのエンジン, その版のキャッシュ)。ロックを持った状態で呼ぶ。
+        ファイルが変わっていたら、新しい版は別スレッドで開いて差し替える（それまでは古い版で答える）。
+        """
+        return self._reloader.current()
+
+    def close(self):
+        self._reloader.close()
+
+    def version(self):
+        """
+        読み込み済みの版（Dataset.version と同じ形の文字列。未読み込みなら None）。
+        ファイルが変わっていれば、新しい版への差し替えを別スレッドで始める。
+        """
+        return self._reloader.version()
+
+    def _token_index(self, engine, cache, col):
+        """
+        全文検索用の転置インデックス（列の値の種類から 1 回だけ作る）。ロックを持った状態で呼ぶ。
+        """
+        index = cache.get(("tokens", col))
+        if index is None:
+            quoted = _quote(col)
+            rows = engine.rows(
+                f"SELECT DISTINCT {quoted} FROM {TABLE} WHERE {quoted} IS NOT NULL", []
+            )
+            index = TokenIndex.build(sorted(str(value) for value, in rows))
+            cache[("tokens", col)] = index
+        return index
+
+    # ------------------------------------------------------------
+    # SQL の組み立て
+    # ------------------------------------------------------------
+    def _where(self, engine, cache, state, ignore_keys=None, extra=()):
+        """
+        filters-state → WHERE 句とパラメータ（効いていないフィルタは入れない）。
+        """
+        clauses, params = list(extra), []
+        for key, val in canonical_state(state, set(ignore_keys or [])).items():
+            if key in CHECKBOX_FILTER_MAP:
+                col = CHECKBOX_FILTER_MAP[key]
+                if col not in engine.columns:
+                    continue
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(val))})")
+                params += val
+                continue
+            if key in TEXT_FILTER_MAP:
+                col = TEXT_FILTER_MAP[key]
+                if col in engine.columns:
+                    # 大文字・小文字を区別しない部分一致
+                    clauses.append(f"instr(lower({_quote(col)}), ?) > 0")
+                    params.append(val.lower())
+                continue
+            if key in SEARCH_FILTER_MAP:
+                col = SEARCH_FILTER_MAP[key]
+                if col in engine.columns:
+                    # 一致する値を転置インデックスで求めて、値の IN にする
+                    matched = self._token_index(engine, cache, col).search(val)
+                    if matched:
+                        clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(matched))})")
+                        params += matched
+                    else:
+                        clauses.append("1 = 0")
+                continue
+
+            if not isinstance(val, list) or len(val) != 2:
+                continue
+            if key in RANGE_FILTER_MAP and RANGE_FILTER_MAP[key] in engine.columns:
+                low, high, values = engine.quantity_bounds(*val)
+                clauses.append(f"{_quote(RANGE_FILTER_MAP[key])} BETWEEN {low} AND {high}")
+                params += values
+            elif key in DATE_FILTER_MAP and DATE_FILTER_MAP[key] in engine.columns:
+                low, high, values = engine.date_bounds(*(pd.Timestamp(v) for v in val))
+                clauses.append(f"{_quote(DATE_FILTER_MAP[key])} BETWEEN {low} AND {high}")
+                params += values
+            elif key in MIXED_RANGE_FILTER_MAP and MIXED_RANGE_FILTER_MAP[key] in engine.columns:
+                # 文字列・欠損の行は数値部分が NULL なので範囲外になる
+                low, high, values = engine.number_bounds(*val)
+                clauses.append(f"{engine.number(MIXED_RANGE_FILTER_MAP[key])} BETWEEN {low} AND {high}")
+                params += values
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def _order_by(self, engine, sort_by):
+        """
+        DataTable の sort_by → ORDER BY 句。
+        欠損は昇順・降順とも最後。mixed_* は数値（数値順）→ 文字列（辞書順）の順位で並べ、
+        降順はその逆（文字列 → 数値）。最後に元の行番号で並べる（安定ソートと同じ）。
+        """
+        terms = []
+        for s in sort_by or []:
+            col = s["column_id"]
+            if col not in engine.columns:
+                continue
+            direction = "DESC" if s.get("direction") == "desc" else "ASC"
+            quoted = _quote(col)
+            if _kind(col) == "mixed":
+                number = engine.number(col)
+                number_rank, text_rank = (1, 0) if direction == "DESC" else (0, 1)
+                terms += [
+                    f"CASE WHEN {quoted} IS NULL THEN 2 WHEN {number} IS NOT NULL "
+                    f"THEN {number_rank} ELSE {text_rank} END",
+                    f"{number} {direction}",
+                    f"CASE WHEN {number} IS NULL THEN {quoted} END {direction}",
+                ]
+            else:
+                terms += [f"{quoted} IS NULL", f"{quoted} {direction}"]
+        terms.append(ROW_COLUMN)
+        return " ORDER BY " + ", ".join(terms)
+
+    # ------------------------------------------------------------
+    # クエリ
+    # ------------------------------------------------------------
+    def page(self, state, sort_by, page_current, page_size, columns=None):
+        """
+        フィルタ → ソート → ページ分けを 1 本の SQL で行い、そのページの records を返す
+        （utils/filtering.take_page() + decode_page() と同じ形）。
+        """
+        page_current = page_current or 0
+        page_size = page_size or 100
+        with self._lock:
+            engine, cache = self._current()
+            wanted = set(columns) if columns is not None else None
+            selected = [c for c in engine.columns if wanted is None or c in wanted]
+            if not selected:
+                return []
+            where, params = self._where(engine, cache, state)
+            sql = (
+                f"SELECT {', '.join(_quote(c) for c in selected)} FROM {TABLE}"
+                f"{where}{self._order_by(engine, sort_by)} LIMIT ? OFFSET ?"
+            )
+            df = engine.frame(sql, params + [page_size, page_current * page_size])
+        return decode_page(apply_schema(df))
+
+    def count(self, state, ignore_keys=None):
+        """
+        フィルタに合う行数。
+        """
+        with self._lock:
+            engine, cache = self._current()
+            where, params = self._where(engine, cache, state, ignore_keys)
+            return engine.rows(f"SELECT COUNT(*) FROM {TABLE}{where}", params)[0][0]
+
+    def facet_counts(self, col, state, ignore_keys=None):
+        """
+        フィルタに合う行の col の値ごとの行数 {値: 行数}（欠損除外・値の昇順）。GROUP BY で求める。
+        """
+        with self._lock:
+            engine, cache = self._current()
+            if col not in engine.columns:
+                return {}
+            quoted = _quote(col)
+            where, params = self._where(
+                engine, cache, state, ignore_keys, extra=[f"{quoted} IS NOT NULL"]
+            )
+            rows = engine.rows(
+                f"SELECT {quoted}, COUNT(*) FROM {TABLE}{where} "
+                f"GROUP BY {quoted} ORDER BY {quoted}",
+                params,
+            )
+        return {str(value): count for value, count in rows}
+
+    def facet_values(self, col, state, ignore_keys=None):
+        """
+        チェックリストの選択肢用：フィルタに合う行に出てくる col の値（欠損除外・昇順）。
+        """
+        return list(self.facet_counts(col, state, ignore_keys))
+
+    def _value(self, engine, col):
+        # 範囲フィルタ・ヒストグラムに使う数値（mixed_* は数値部分）
+        return engine.number(col) if _kind(col) == "mixed" else _quote(col)
+
+    def _numeric_bounds(self, engine, col):
+        value = self._value(engine, col)
+        low, high = engine.rows(f"SELECT MIN({value}), MAX({value}) FROM {TABLE}", [])[0]
+        return None if low is None else (float(low), float(high))
+
+    def numeric_bounds(self, col):
+        """
+        RangeSlider 用：数値列の (min, max)（丸めない。mixed_* は数値部分）。値が無ければ None。
+        """
+        with self._lock:
+            engine, cache = self._current()
+            if col not in engine.columns:
+                return None
+            return self._numeric_bounds(engine, col)
+
+    def unique_dates(self, col="date"):
+        """
+        日付列のユニーク日付（昇順の datetime.date のリスト）。
+        """
+        with self._lock:
+            engine, cache = self._current()
+            if col not in engine.columns:
+                return []
+            day = engine.day(col)
+            rows = engine.rows(
+                f"SELECT DISTINCT {day} FROM {TABLE} WHERE {_quote(col)} IS NOT NULL ORDER BY 1", []
+            )
+        return [pd.Timestamp(value).date() for value, in rows]
+
+    def histogram(self, col, state, ignore_keys=None) -> Histogram:
+        """
+        範囲スライダーの分布表示用：フィルタに合う行の col のヒストグラム
+        （ビンは全行の min / max から作るので、pandas の経路の Dataset.histogram と同じ）。
+        """
+        with self._lock:
+            engine, cache = self._current()
+            if col not in engine.columns:
+                return Histogram.from_bounds(None, None)
+            base = cache.get(("histogram", col))
+            if base is None:
+                base = Histogram.from_bounds(*(self._numeric_bounds(engine, col) or (None, None)))
+                cache[("histogram", col)] = base
+            value = self._value(engine, col)
+            where, params = self._where(
+                engine, cache, state, ignore_keys, extra=[f"{value} IS NOT NULL"]
+            )
+            # ビン番号はエンジンの中で求めて GROUP BY する（返すのはビンごとの件数だけ）。
+            # 割り算の丸めで境界の値が 1 つずれることがあるので、境界（i * 幅 + 始点。
+            # Histogram.edges と同じ計算）と比べて直す
+            start, step = base.spacing()
+            edge = "{} * CAST(? AS DOUBLE) + CAST(? AS DOUBLE)".format
+            code = engine.floor(f"({value} - CAST(? AS DOUBLE)) / CAST(? AS DOUBLE)")
+            rows = engine.rows(
+                f"SELECT CASE WHEN v < {edge('k')} THEN k - 1 "
+                f"WHEN v >= {edge('(k + 1)')} THEN k + 1 ELSE k END AS code, COUNT(*) "
+                f"FROM (SELECT {value} AS v, {code} AS k FROM {TABLE}{where}) GROUP BY code",
+                [step, start, step, start, start, step, *params],
+            )
+        return base.from_codes([code for code, _ in rows], [count for _, count in rows])
+
+
+_backends = BackendPool(SqlQueryBackend)
+
+
+def get_query_backend(name=None) -> SqlQueryBackend:
+    """
+    データセット名（None は既定）の SqlQueryBackend（データセットごとに 1 つ。
+    開いておくのは最近使った QUERY_BACKEND_MAX_DATASETS 個まで）。
+    """
+    return _backends.get(name)
@@ -0,0 +1,491 @@
+# database/queries_sharded.py
+"""
+テーブルのクエリを、行で分けたシャードごとのワーカープロセスで実行するバックエンド
+（utils/constants.QUERY_BACKEND = "sharded" のとき utils/query_backend.py から使う）。
+
+1 プロセスではフィルタが間に合わない大きな表（1,000 万行〜）向け。
+- 列指向キャッシュ（Parquet）から、圧縮しない Arrow IPC ファイル
+  （database/.cache/<CSV 名>.<版>.<シャード数>.arrow。バッチはシャードごとに 1 つ）を書き出す
+- 表を行の範囲で SHARD_WORKERS 個のシャードに分け、シャード i はワーカープロセス i が受け持つ
+- ワーカーは Arrow ファイルをメモリマップで開き、自分の行の範囲だけを Dataset にする
+  （最初の 1 回だけ。ファイルのページは OS のページキャッシュをプロセス間で共有する）
+- クエリごとにワーカーへ送るのは filters-state などの引数だけで、
+  返ってくるのは行番号・件数・上位 k 行のソートキーだけ（表はコピー・転送しない）
+  - page     : 各シャードがフィルタ → ソートして上位 k 行（k = 表示ページの末尾まで）を返し、
+               k 行どうしをマージして、ページの行だけを Arrow ファイルから取り出す
+  - count / facet_counts: 各シャードの件数・値ごとの件数を足し合わせる
+  - positions: 各シャードのフィルタに合う行番号（表全体の行番号）をつなげる
+  - numeric_bounds / unique_dates / histogram: 各シャードの min/max・日付・ビンごとの件数をまとめる
+    （/ingest の追記はメモリ上の Dataset にだけ入るので、この経路では /ingest は 409 で断る）
+- シャードの中のフィルタ・ソートは pandas の経路（utils/filtering.py）そのものなので、
+  インデックス・フィルタ結果キャッシュ・実行計画もシャードごとに効く
+
+並び順は pandas の経路とそろえる（欠損は最後、mixed_* は数値 → 文字列、同順位は元の行順。
+シャードは連続した行の範囲なので、同順位は全体の行番号で並べれば元の行順になる）。
+SQL のバックエンド（database/queries_csv.py）と同じ page() / count() / facet_values() を持つ。
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:   # QUERY_BACKEND = "sharded" のときだけ必要
+    pa = pq = None
+
+from database.backend_pool import BackendPool
+from database.dataset import Dataset
+from database.dataset_loader import ensure_cache
+from database.histogram import Histogram
+from database.mixed import MIXED_NUMBER, MIXED_TEXT
+from database.schema import apply_schema, combine_chunks, decode_page, sort_categories
+from database.watcher import BackgroundReloader
+from utils.constants import SHARD_WORKERS
+from utils.filtering import filtered_positions, sort_positions
+
+_ROW = "_row"
+
+
+def _ensure_arrow(cache_path: Path, shards: int) -> Path:
+    """
+    Parquet のキャッシュから、圧縮しない Arrow IPC ファイルを書き出す（無いときだけ）。
+    ファイル名に Parquet の更新時刻を入れて版ごとに別のファイルにする
+    （作り直している間も、古い版のシャードは古いファイルを読み続けられるように）。
+    レコードバッチはシャードの行の範囲（shard_bounds）ごとに 1 つにする。シャードがちょうど
+    1 チャンクになるので、ワーカーはメモリマップのバッファをつなぎ直さずにそのまま使える。
+    辞書型の列は値の型に戻す（IPC ファイルは行グループごとに違う辞書を持てないため。
+    ワーカーがシャードを読むときに apply_schema() で辞書化し直す）。
+    """
+    version = cache_path.stat().st_mtime_ns
+    arrow_path = cache_path.with_name(f"{cache_path.stem}.{version}.{shards}.arrow")
+    if arrow_path.exists():
+        return arrow_path
+
+    parquet = pq.ParquetFile(cache_path)
+    schema = pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in parquet.schema_arrow
+    ])
+    sizes = [stop - start for start, stop in shard_bounds(parquet.metadata.num_rows, shards)]
+    tmp_path = arrow_path.with_name(arrow_path.name + ".tmp")
+    with pa.ipc.new_file(str(tmp_path), schema) as writer:
+        # 行グループを読みながら、シャード 1 つ分の行がたまるたびに 1 バッチにまとめて書く
+        pending = schema.empty_table()
+        for batch in parquet.iter_batches():
+            pending = pa.concat_tables([pending, pa.Table.from_batches([batch]).cast(schema)])
+            while sizes and pending.num_rows >= sizes[0]:
+                writer.write_table(pending.slice(0, sizes[0]).combine_chunks())
+                pending = pending.slice(sizes.pop(0))
+    tmp_path.replace(arrow_path)
+    return arrow_path
+
+
+def _open_arrow(arrow_path):
+    """
+    Arrow IPC ファイルをメモリマップで開いた Table（読むのは触った列・行のページだけ）。
+    """
+    return pa.ipc.open_file(pa.memory_map(str(arrow_path))).read_all()
+
+
+def shard_bounds(n, shards):
+    """
+    [0, n) を shards 個に分けた行の範囲 [(start, stop), ...]。
+    """
+    edges = np.linspace(0, n, shards + 1).astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+# ------------------------------------------------------------
+# ワーカープロセス側
+# ------------------------------------------------------------
+_shards = {}   # (Parquet のキャッシュ, 開始行, 終了行) → (Arrow ファイル = 版, Dataset)
+
+
+def _shard_dataset(source, arrow_path, start, stop):
+    """
+    このワーカーが受け持つ行の範囲の Dataset（Arrow ファイル = 版が変わったら読み直す）。
+    """
+    key = (source, start, stop)
+    cached = _shards.get(key)
+    if cached is None or cached[0] != arrow_path:
+        # シャードは 1 チャンク（_ensure_arrow）なので、文字列・mixed_* の文字列部分は
+        # メモリマップのバッファをそのまま使う（コピーするのは欠損を埋める数値・辞書化する列だけ）
+        table = _open_arrow(arrow_path).slice(start, stop - start)
+        df = combine_chunks(sort_categories(apply_schema(table.to_pandas(split_blocks=True))))
+        cached = (arrow_path, Dataset(df))
+        _shards[key] = cached
+    return cached[1]
+
+
+def _release_shards(source, arrow_path):
+    """
+    版（Arrow ファイル）arrow_path のシャードの Dataset を手放す（差し替え・close() の後片付け）。
+    """
+    for key in [key for key, (path, _) in _shards.items() if key[0] == source and path == arrow_path]:
+        del _shards[key]
+
+
+def _sort_keys(dataset, rows, sort_by):
+    """
+    rows の行の、シャードをまたいで比べられるソートキー [(名前, 値の配列, 昇順か), ...]。
+    mixed_* の順位（Dataset.sort_keys）はシャードの中でしか比べられないので、
+    (数値 / 文字列の別, 数値, 文字列) の 3 つに分けて返す。
+    """
+    keys = []
+    for i, s in enumerate(sort_by or []):
+        col, ascending = s["column_id"], s["direction"] == "asc"
+        if col not in dataset.df.columns:
+            continue
+        if dataset.is_mixed(col):
+            mixed = dataset.mixed_column(col)
+            tags = mixed.tags[rows]
+            group = np.where(tags == MIXED_NUMBER, 0.0, np.where(tags == MIXED_TEXT, 1.0, np.nan))
+            texts = np.where(tags == MIXED_TEXT, mixed.text_values(rows), None)
+            keys += [
+                (f"{i}_group", group, ascending),
+                (f"{i}_number", mixed.numbers[rows], ascending),
+                (f"{i}_text", texts, ascending),
+            ]
+        else:
+            values = dataset.df[col].take(rows)
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # カテゴリは辞書順なので、文字列で比べても同じ順になる
+                values = values.astype(object)
+            keys.append((str(i), values.to_numpy(), ascending))
+    return keys
+
+
+def _op_top(dataset, offset, state, sort_by, k):
+    positions = filtered_positions(state, dataset=dataset)
+    if sort_by:
+        positions = sort_positions(positions, sort_by, dataset=dataset)
+    elif positions is None:
+        positions = np.arange(min(k, len(dataset)), dtype=np.int32)
+    top = positions[:k]
+    return top.astype(np.int64) + offset, _sort_keys(dataset, top, sort_by)
+
+
+def _op_positions(dataset, offset, state, ignore_keys):
+    positions = filtered_positions(state, ignore_keys, dataset)
+    if positions is None:
+        positions = np.arange(len(dataset))
+    return positions.astype(np.int64) + offset
+
+
+def _op_count(dataset, offset, state, ignore_keys):
+    positions = filtered_positions(state, ignore_keys, dataset)
+    return len(dataset) if positions is None else len(positions)
+
+
+def _op_facet_counts(dataset, offset, col, state, ignore_keys):
+    if col not in dataset.df.columns:
+        return {}
+    positions = filtered_positions(state, ignore_keys, dataset)
+    s = dataset.df[col]
+    if positions is not None:
+        s = s.take(positions)
+    return {str(v): int(n) for v, n in s.value_counts(dropna=True).items() if n}
+
+
+def _op_bounds(dataset, offset, col):
+    if col not in dataset.df.columns:
+        return None
+    return dataset.numeric_bounds(col, decimals=None)
+
+
+def _op_unique_dates(dataset, offset):
+    return dataset.unique_dates()
+
+
+def _op_histogram(dataset, offset, col, edges, state, ignore_keys):
+    # ビン（edges）は親が表全体の min / max から決めて渡す（シャードごとに作ると合わない）
+    counts = Histogram(edges, np.zeros(len(edges) - 1, dtype=np.int64))
+    if col not in dataset.df.columns:
+        return counts.counts
+    values = np.asarray(dataset.histogram_values(col), dtype=np.float64)
+    positions = filtered_positions(state, ignore_keys, dataset)
+    if positions is not None:
+        values = values[positions]
+    return counts.count(values).counts
+
+
+_OPS = {
+    "top": _op_top,
+    "positions": _op_positions,
+    "count": _op_count,
+    "facet_counts": _op_facet_counts,
+    "bounds": _op_bounds,
+    "unique_dates": _op_unique_dates,
+    "histogram": _op_histogram,
+}
+
+
+def _shard_call(op, source, arrow_path, start, stop, args):
+    """
+    ワーカープロセスで実行する 1 シャード分の処理。
+    """
+    return _OPS[op](_shard_dataset(source, arrow_path, start, stop), start, *args)
+
+
+# ------------------------------------------------------------
+# ワーカープロセス（シャード i → ワーカー i）
+# ------------------------------------------------------------
+_PROJECT_DIR = Path(__file__).resolve().parent.parent
+_workers = None
+_workers_lock = threading.Lock()
+
+
+class _Worker:
+    """
+    シャード 1 つ分のワーカープロセス（python -m database.shard_worker）。
+    submit() は concurrent.futures の Future を返す（送受信はこのワーカー専用のスレッドで順に行う）。
+    プロセスが落ちていたら起動し直す（シャードは新しいプロセスが Arrow ファイルから読み直す）。
+    """
+
+    def __init__(self):
+        self._start()
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shard")
+
+    def _start(self):
+        conn, child = multiprocessing.Pipe()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "database.shard_worker", str(child.fileno())],
+            cwd=_PROJECT_DIR, pass_fds=[child.fileno()],
+        )
+        child.close()
+        self._conn = conn
+
+    def _restart(self):
+        self._conn.close()
+        if self.process.poll() is None:
+            self.process.kill()
+        code = self.process.wait()
+        print(f"[query] shard worker {self.process.pid} exited ({code}); restarting")
+        self._start()
+
+    def submit(self, fn, *args):
+        return self._sender.submit(self._call, fn, args)
+
+    def _call(self, fn, args):
+        if self.process.poll() is not None:
+            self._restart()
+        try:
+            return self._send(fn, args)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            # 処理中に落ちた：起動し直して 1 回だけやり直す（もう一度落ちたらそのまま例外にする）
+            self._restart()
+            return self._send(fn, args)
+
+    def _send(self, fn, args):
+        self._conn.send((fn, args))
+        ok, result = self._conn.recv()
+        if not ok:
+            raise result
+        return result
+
+
+def _get_workers():
+    """
+    シャードごとのワーカー（1 プロセスずつ）。
+    シャード i を毎回同じプロセスに送るので、シャードの Dataset・インデックスは各プロセスに 1 つで済む。
+    スレッドを使っている Dash のサーバーから fork せず、database/shard_worker.py を新しく起動する。
+    """
+    global _workers
+    with _workers_lock:
+        if _workers is None:
+            count = SHARD_WORKERS or os.cpu_count() or 1
+            workers = [_Worker() for _ in range(count)]
+            # 起動（import）が終わるまで待っておく
+            for future in [worker.submit(os.getpid) for worker in workers]:
+                future.result()
+            _workers = workers
+        return _workers
+
+
+# ------------------------------------------------------------
+# 親プロセス側
+# ------------------------------------------------------------
+class ShardedQueryBackend:
+    """
+    1 つのデータセット（CSV）を行で分けたシャードに、クエリを配って結果を集める。
+    """
+
+    def __init__(self, csv_path, verbose=True):
+        if pa is None:
+            raise ImportError('QUERY_BACKEND = "sharded" requires pyarrow')
+        self.path = Path(csv_path)
+        self.verbose = verbose
+        self._reloader = BackgroundReloader(
+            self.path, self._map, on_swap=self._unlink, on_close=self._release
+        )
+
+    def _map(self):
+        started = time.perf_counter()
+        cache_path = ensure_cache(self.path, "parquet", verbose=self.verbose)
+        shards = len(_get_workers())
+        arrow_path = _ensure_arrow(cache_path, shards)
+        table = _open_arrow(arrow_path)
+        if self.verbose:
+            elapsed = time.perf_counter() - started
+            print(
+                f"[query] {self.path.name}: mapped {table.num_rows:,} rows "
+                f"for {shards} shards in {elapsed:.3f}s"
+            )
+        return table, cache_path, arrow_path
+
+    @classmethod
+    def _unlink(cls, old):
+        # 古い版の Arrow ファイルを消す（メモリマップで開いているプロセスはそのまま読める）
+        _, _, arrow_path = old
+        arrow_path.unlink(missing_ok=True)
+        cls._release(old)
+
+    @staticmethod
+    def _release(old):
+        # ワーカーが持つその版のシャードを手放させる（次のクエリを待たずにメモリを返す）。
+        # close() では Arrow ファイルは残す（開き直したときに書き出し直さずに使える）
+        _, cache_path, arrow_path = old
+        for worker in _workers or []:
+            worker.submit(_release_shards, str(cache_path), str(arrow_path))
+
+    def close(self):
+        self._reloader.close()
+
+    def _current(self):
+        """
+        (Arrow の Table, Parquet のキャッシュ, Arrow ファイル)。CSV が変わっていたら、
+        新しい版は別スレッドで書き出して差し替える（それまでは古い版で答える）。
+        1 つのクエリの中では、最初に取った版をそのまま使う。
+        """
+        loaded, _ = self._reloader.current()
+        return loaded
+
+    def version(self):
+        """
+        読み込み済みの版（Dataset.version と同じ形の文字列。未読み込みなら None）。
+        ファイルが変わっていれば、新しい版への差し替えを別スレッドで始める。
+        """
+        return self._reloader.version()
+
+    def _scatter(self, loaded, op, *args):
+        """
+        全シャードで op を実行し、シャードの順の結果のリストを返す。
+        """
+        table, cache_path, arrow_path = loaded
+        workers = _get_workers()
+        futures = [
+            worker.submit(_shard_call, op, str(cache_path), str(arrow_path), start, stop, args)
+            for worker, (start, stop) in zip(workers, shard_bounds(table.num_rows, len(workers)))
+        ]
+        return [future.result() for future in futures]
+
+    # ------------------------------------------------------------
+    # クエリ
+    # ------------------------------------------------------------
+    def page(self, state, sort_by, page_current, page_size, columns=None):
+        """
+        フィルタ → ソート → ページ分けし、そのページの records を返す
+        （utils/filtering.take_page() + decode_page() と同じ形）。
+        """
+        loaded = self._current()
+        table = loaded[0]
+        page_current = page_current or 0
+        page_size = page_size or 100
+        start = page_current * page_size
+        wanted = set(columns) if columns is not None else None
+        selected = [c for c in table.column_names if wanted is None or c in wanted]
+        if not selected:
+            return []
+
+        # 各シャードの上位 k 行をマージする（同順位は全体の行番号 = 元の行順）
+        sort_by = [s for s in (sort_by or []) if s["column_id"] in table.column_names]
+        parts = self._scatter(loaded, "top", state, sort_by, start + page_size)
+        merged = pd.DataFrame({_ROW: np.concatenate([rows for rows, _ in parts])})
+        names, ascending = [], []
+        for i, (name, _, direction) in enumerate(parts[0][1]):
+            merged[name] = np.concatenate([keys[i][1] for _, keys in parts])
+            names.append(name)
+            ascending.append(direction)
+        merged = merged.sort_values(
+            names + [_ROW], ascending=ascending + [True], kind="stable", na_position="last"
+        )
+        rows = merged[_ROW].to_numpy()[start:start + page_size]
+
+        page = table.select(selected).take(pa.array(rows, type=pa.int64())).to_pandas()
+        return decode_page(apply_schema(page))
+
+    def positions(self, state, ignore_keys=None):
+        """
+        フィルタに合う行の、表全体の行番号（昇順）。
+        """
+        return np.concatenate(self._scatter(self._current(), "positions", state, ignore_keys))
+
+    def count(self, state, ignore_keys=None):
+        """
+        フィルタに合う行数。
+        """
+        return int(sum(self._scatter(self._current(), "count", state, ignore_keys)))
+
+    def facet_counts(self, col, state, ignore_keys=None):
+        """
+        フィルタに合う行の col の値ごとの行数 {値: 行数}（欠損除外・値の昇順）。
+        """
+        counts = {}
+        for part in self._scatter(self._current(), "facet_counts", col, state, ignore_keys):
+            for value, n in part.items():
+                counts[value] = counts.get(value, 0) + n
+        return dict(sorted(counts.items()))
+
+    def facet_values(self, col, state, ignore_keys=None):
+        """
+        チェックリストの選択肢用：フィルタに合う行に出てくる col の値（欠損除外・昇順）。
+        """
+        return list(self.facet_counts(col, state, ignore_keys))
+
+    def numeric_bounds(self, col):
+        """
+        RangeSlider 用：数値列の (min, max)（丸めない。mixed_* は数値部分）。値が無ければ None。
+        """
+        return self._numeric_bounds(self._current(), col)
+
+    def _numeric_bounds(self, loaded, col):
+        parts = [part for part in self._scatter(loaded, "bounds", col) if part is not None]
+        if not parts:
+            return None
+        return min(low for low, _ in parts), max(high for _, high in parts)
+
+    def unique_dates(self, col="date"):
+        """
+        日付列のユニーク日付（昇順の datetime.date のリスト）。
+        """
+        return sorted(set().union(*self._scatter(self._current(), "unique_dates")))
+
+    def histogram(self, col, state, ignore_keys=None) -> Histogram:
+        """
+        範囲スライダーの分布表示用：フィルタに合う行の col のヒストグラム
+        （ビンは表全体の min / max から作るので、pandas の経路の Dataset.histogram と同じ）。
+        """
+        loaded = self._current()
+        base = Histogram.from_bounds(*(self._numeric_bounds(loaded, col) or (None, None)))
+        parts = self._scatter(loaded, "histogram", col, base.edges, state, ignore_keys)
+        return Histogram(base.edges, np.sum(parts, axis=0).astype(np.int64))
+
+
+_backends = BackendPool(ShardedQueryBackend)
+
+
+def get_sharded_backend(name=None) -> ShardedQueryBackend:
+    """
+    データセット名（None は既定）の ShardedQueryBackend（データセットごとに 1 つ。
+    開いておくのは最近使った QUERY_BACKEND_MAX_DATASETS 個まで）。
+    """
+    return _backends.get(name)
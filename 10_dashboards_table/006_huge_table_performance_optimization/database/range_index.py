@@ -0,0 +1,76 @@
+# database/range_index.py
+"""
+数値列（quantity_*）の範囲フィルタ用インデックス。
+
+値を昇順に並べた配列と、その並びの行番号（並べ替えの順列）を 1 回だけ作っておき、
+[min, max] の範囲は二分探索 2 回で「並べた配列のどこからどこまでか」を求める。
+手間は O(log n + 該当行数) で、毎回全行を比較する必要がない。
+結果は database/bitmap_index.RowSet なので、チェックリストの結果と積を取れる。
+"""
+import numpy as np
+import pandas as pd
+
+from database.bitmap_index import DENSE_RATIO, RowSet, _pack
+
+
+class SortedRangeIndex:
+    """
+    - values: 欠損を除いた値（昇順）
+    - rows  : values[i] の行番号（int32）
+    - n     : 全行数（欠損の行も含む）
+    """
+
+    def __init__(self, n, values, rows):
+        self.n = n
+        self.values = values
+        self.rows = rows
+
+    @classmethod
+    def build(cls, series: pd.Series, offset=0):
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors="coerce")
+        dtype = np.float32 if series.dtype == np.float32 else np.float64
+        values = series.to_numpy(dtype=dtype, na_value=np.nan)
+        present = ~np.isnan(values)
+        rows = (np.flatnonzero(present) + offset).astype(np.int32)
+        values = values[present]
+        order = np.argsort(values, kind="stable")
+        return cls(offset + len(series), values[order], rows[order])
+
+    def bounds(self, low, high):
+        """
+        [low, high] に入る値が values のどこからどこまでか（start, stop）。
+        境界は列と同じ型にそろえて比較する（float32 の丸め誤差で端が落ちないように）。
+        """
+        low, high = self.values.dtype.type(low), self.values.dtype.type(high)
+        start = np.searchsorted(self.values, low, side="left")
+        stop = np.searchsorted(self.values, high, side="right")
+        return start, max(start, stop)
+
+    def count(self, low, high):
+        start, stop = self.bounds(low, high)
+        return int(stop - start)
+
+    def select(self, low, high) -> RowSet:
+        """
+        値が [low, high] に入る行（欠損は入らない）。
+        """
+        start, stop = self.bounds(low, high)
+        rows = self.rows[start:stop]
+        if len(rows) <= self.n * DENSE_RATIO:
+            return RowSet(self.n, rows=np.sort(rows))
+        return RowSet(self.n, bits=_pack(rows, self.n))
+
+    def append(self, series: pd.Series, offset) -> "SortedRangeIndex":
+        """
+        offset 行目から series の行を足したインデックス（行の追記用）。
+        追記分だけ並べ、既存の並びに差し込む（全体を並べ直さない）。
+        """
+        delta = SortedRangeIndex.build(series, offset=offset)
+        values = delta.values.astype(self.values.dtype)
+        at = np.searchsorted(self.values, values, side="right")
+        return SortedRangeIndex(
+            delta.n,
+            np.insert(self.values, at, values),
+            np.insert(self.rows, at, delta.rows),
+        )
@@ -0,0 +1,281 @@
+# database/registry.py
+"""
+複数データセットのレジストリ。
+
+database/ 配下の CSV（DATASET_PATTERN に一致するもの）を一覧にし、
+セッションごとに選ばれたデータセットを DatasetProvider 経由で読み込む。
+読み込み済みデータセットの合計メモリが上限を超えたら、
+最も長く使われていないものから追い出す（LRU）。
+追い出したデータセットはインデックスなどの派生キャッシュもまとめて捨てる。
+
+ファイルが書き換わったときは reload() で新しい版を作ってから差し替える
+（database/watcher.py から呼ばれる）。データセットの版に紐づくキャッシュは
+subscribe() で登録しておくと、差し替え時に通知される。
+行の追記（database/ingest.py）も同じく新しい版を作って差し替える。
+
+派生データは、追い出すとき・差し替えたとき・save_snapshots()（アプリ終了時）に
+スナップショット（database/snapshot.py）へ書き出し、次回の読み込みで読み戻す。
+
+    from database.registry import get_dataset
+    df = get_dataset().df                    # 既定のデータセット
+    df = get_dataset("test_output_200000.csv").df
+"""
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from database.dataset import DEFAULT_DATA_PATH, Dataset, DatasetProvider, StaleDatasetError
+from utils.constants import (
+    DATASET_MEMORY_BUDGET_MB,
+    DATASET_PATTERN,
+    DATASET_SNAPSHOT_ENABLED,
+)
+
+
+class DatasetRegistry:
+
+    def __init__(self, default_path=DEFAULT_DATA_PATH, pattern=DATASET_PATTERN,
+                 memory_budget_mb=DATASET_MEMORY_BUDGET_MB, columns=None,
+                 snapshots=DATASET_SNAPSHOT_ENABLED):
+        self.snapshots = snapshots
+        self._lock = threading.RLock()
+        self._providers = OrderedDict()   # name -> DatasetProvider（末尾ほど最近使った）
+        self._listeners = []
+        self._memory_trackers = []
+        self._append_lock = threading.Lock()
+        self.configure(default_path, pattern, memory_budget_mb, columns)
+
+    def configure(self, default_path=None, pattern=None, memory_budget_mb=None,
+                  columns=None):
+        """
+        既定のデータセット・一覧のパターン・メモリ上限・起動時に読む列を設定する。
+        読み込み済みのデータセットはすべて手放す。
+        """
+        with self._lock:
+            if default_path is not None:
+                default_path = Path(default_path)
+                self.data_dir = default_path.parent
+                self.default_name = default_path.name
+            if pattern is not None:
+                self.pattern = pattern
+            if memory_budget_mb is not None:
+                self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+            self._columns = list(columns) if columns is not None else None
+
+            for provider in self._providers.values():
+                provider.unload()
+            self._providers.clear()
+
+    def names(self):
+        """
+        選択できるデータセット名（ファイル名）の一覧。既定のデータセットは必ず含める。
+        """
+        names = sorted(p.name for p in self.data_dir.glob(self.pattern) if p.is_file())
+        if self.default_name not in names:
+            names.insert(0, self.default_name)
+        return names
+
+    def resolve(self, name=None):
+        """
+        クライアントから来た名前を検証する（一覧に無い名前は既定のデータセット扱い）。
+        """
+        if name and name != self.default_name and name in self.names():
+            return name
+        return self.default_name
+
+    def _provider(self, name):
+        provider = self._providers.get(name)
+        if provider is None:
+            provider = DatasetProvider(
+                self.data_dir / name, columns=self._columns, snapshots=self.snapshots
+            )
+            self._providers[name] = provider
+        return provider
+
+    def get(self, name=None) -> Dataset:
+        name = self.resolve(name)
+        with self._lock:
+            provider = self._provider(name)
+            self._providers.move_to_end(name)
+
+        # 読み込み自体はレジストリのロックの外で（別データセットの読み込みを止めない）
+        dataset = provider.get()
+        self._evict(keep=name)
+        return dataset
+
+    def peek(self, name=None):
+        """
+        読み込み済みなら Dataset、未読み込みなら None（読み込みは行わない）。
+        """
+        name = self.resolve(name)
+        with self._lock:
+            provider = self._providers.get(name)
+        return provider.dataset if provider is not None else None
+
+    def providers(self):
+        """
+        (name, DatasetProvider) の一覧（スナップショット）。
+        """
+        with self._lock:
+            return list(self._providers.items())
+
+    def subscribe(self, listener):
+        """
+        listener(name, old_dataset, new_dataset) を登録する。
+        データセットが差し替わったとき・追い出されたとき（new は None）に呼ばれる。
+        """
+        self._listeners.append(listener)
+
+    def track_memory(self, usage):
+        """
+        usage(dataset) → 他のモジュールがそのデータセット（の版）のために持っているバイト数
+        （フィルタ結果のキャッシュなど）を登録する。loaded() と追い出しの合計に入る。
+        """
+        self._memory_trackers.append(usage)
+
+    def _notify(self, name, old, new):
+        for listener in list(self._listeners):
+            try:
+                listener(name, old, new)
+            except Exception as e:  # キャッシュ破棄の失敗で差し替えを止めない
+                print(f"[dataset] listener failed for {name}: {e}")
+
+    def reload(self, name, warm=None):
+        """
+        データセットを読み直して差し替える。
+        新しい版の読み込みと warm(dataset)（インデックス等の構築）は呼び出し元のスレッドで行い、
+        終わってから参照を付け替える。処理中のコールバックは古い版のまま最後まで動く。
+        戻り値: 差し替えたら新しい Dataset / 対象が無い・先に別の版になっていたら None
+        """
+        with self._lock:
+            provider = self._providers.get(name)
+        if provider is None or provider.dataset is None:
+            return None
+
+        old = provider.dataset
+        new = provider.build()
+        if warm is not None:
+            warm(new)
+
+        if provider.swap(new, expected=old) is None:
+            return None
+        self._notify(name, old, new)
+        provider.save_snapshot()
+        return new
+
+    def refresh(self, dataset) -> Dataset:
+        """
+        元ファイルが書き換わった dataset（古い版）の代わりに使う新しい版。
+        ホットリロードが先に差し替えていればその版、まだなら呼び出し元のスレッドで読み直す。
+        """
+        name = dataset.path.name
+        current = self.peek(name)
+        if current is not None and current is not dataset and not current.is_stale():
+            return current
+        # 同時に別のスレッドが差し替えた（None が返った）ときはその版を使う
+        return self.reload(name) or self.get(name)
+
+    def append(self, name, delta):
+        """
+        読み込み済みデータセットに delta（スキーマ変換済みの行）を追記した版へ差し替える。
+        派生データ・インデックスは Dataset.append_rows() が差分で引き継ぐ。
+        """
+        name = self.resolve(name)
+        with self._append_lock:
+            while True:
+                old = self.get(name)
+                with self._lock:
+                    provider = self._providers.get(name)
+                if provider is None:   # 直後に追い出された → 読み直してやり直す
+                    continue
+                new = old.append_rows(delta)
+                # 作っている間にホットリロードで別の版になっていたら、そちらに追記し直す
+                if provider.swap(new, expected=old) is not None:
+                    break
+
+        self._notify(name, old, new)
+        return new
+
+    def save_snapshots(self):
+        """
+        読み込み済みの全データセットの派生データをスナップショットに書き出す。
+        """
+        for _, provider in self.providers():
+            provider.save_snapshot()
+
+    def loaded(self):
+        """
+        読み込み済みデータセットの {name: メモリ使用量(bytes)}（古い順）。
+        DataFrame + 派生データ（Dataset.memory_bytes）+ track_memory() で登録した分。
+        """
+        with self._lock:
+            datasets = [
+                (name, provider.dataset)
+                for name, provider in self._providers.items()
+                if provider.dataset is not None
+            ]
+        return {
+            name: dataset.memory_bytes() + sum(usage(dataset) for usage in self._memory_trackers)
+            for name, dataset in datasets
+        }
+
+    def _evict(self, keep):
+        """
+        合計メモリが上限を超えている間、最も古いものから追い出す（keep は残す）。
+        一覧から外すのはロックの中、スナップショットの書き出し（ファイル I/O）はロックの外で行う。
+        """
+        usage = self.loaded()
+        total = sum(usage.values())
+        evicted = []
+        with self._lock:
+            for name, size in usage.items():
+                if total <= self.memory_budget:
+                    break
+                if name == keep or name not in self._providers:
+                    continue
+                evicted.append((name, size, self._providers.pop(name)))
+                total -= size
+
+        for name, size, provider in evicted:
+            print(f"[dataset] evict {name} ({size / 1e6:,.1f} MB)")
+            provider.save_snapshot()
+            old = provider.dataset
+            provider.unload()
+            self._notify(name, old, None)
+
+
+_registry = DatasetRegistry()
+
+
+def get_registry() -> DatasetRegistry:
+    return _registry
+
+
+def configure_dataset(path=None, columns=None, memory_budget_mb=None):
+    """
+    アプリ起動時に既定のデータセット（と起動時に読む列・メモリ上限）を決める。
+    """
+    _registry.configure(default_path=path, memory_budget_mb=memory_budget_mb,
+                        columns=columns)
+
+
+def get_dataset(name=None) -> Dataset:
+    return _registry.get(name)
+
+
+def retry_stale(fn):
+    """
+    fn が古い版のデータセットで StaleDatasetError になったら、新しい版に差し替えて 1 回だけやり直す。
+    fn はデータセットを名前で受け取り、中で get_dataset() し直すもの（Dataset を渡されたときは
+    同じ版でやり直すことになるので、2 回目のエラーはそのまま上げる）。
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except StaleDatasetError as e:
+            print(f"[dataset] {e}; retrying with the new version")
+            _registry.refresh(e.dataset)
+            return fn(*args, **kwargs)
+    return wrapper
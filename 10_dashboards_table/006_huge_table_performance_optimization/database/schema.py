@@ -0,0 +1,282 @@
+# database/schema.py
+"""
+data_gen/config.COLUMN_DEFINITIONS から列ごとの型（スキーマ）を組み立て、
+読み込んだ DataFrame をその型に変換する。
+
+- nominal（category_*, review）      → category
+- date_random（date）                → datetime64（読み込み時に 1 回だけパース）
+- float_range（quantity_*）          → float32（表示時に decimals で丸める）
+- id_unique / string_random         → 文字列（pyarrow があれば arrow 文字列）
+- mixed（mixed_*）                   → 数値（float32）+ 文字列の組（database/mixed.MixedArray）
+- CHECKLIST_COLUMNS（チェックリストで絞り込む列）→ 値の種類が少なければ category
+  （値を int のコードで持ち、フィルタの比較はコードで行う。
+  ほぼ一意の列は辞書化しても小さくならないので、DICTIONARY_MAX_RATIO で決める）
+
+メモリ（生成した 200,000 行の CSV、pandas 3）: 読み込んだままの 147.2 MB → 107.0 MB（73%）。
+半分以下には届いていない。残りの大半は次の列で、型を変えてもこれ以上は小さくならない。
+- product_1〜8 / id: ほぼ一意の文字列なので、コード化すると コード + 辞書 で却って大きくなる
+  （1 列 3.8 MB。pandas 3 の既定で既に arrow 文字列）
+- mixed_1〜28: 数値 float32 0.8 MB + 文字列 1.55 MB で 1 列 2.35 MB（文字列のままなら 2.9 MB）
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from data_gen.config import COLUMN_DEFINITIONS
+from database.mixed import MixedDtype
+
+# config には無いが、analysis/apply_review_clusters.py で後付けされる列
+EXTRA_CATEGORICAL_COLUMNS = ["review_cluster"]
+
+# チェックリストで絞り込む列（列の種類に関わらずチェックリストのフィルタを付ける）
+CHECKLIST_COLUMNS = ["product_1", "product_2", "mixed_1"]
+
+# チェックリストの列を辞書化（category）するのは、値の種類が行数のこの割合以下のときだけ。
+# product_1 / mixed_1 のようにほぼ一意の列は、辞書化するとコード + 辞書で却って大きくなり、
+# キャッシュからの読み込みも遅くなる（200,000 行で 0.56s → 2.51s）ので文字列のまま持つ
+DICTIONARY_MAX_RATIO = 0.5
+
+_KIND_BY_TYPE = {
+    "id_unique": "string",
+    "date_random": "date",
+    "string_random": "string",
+    "nominal": "category",
+    "float_range": "quantity",
+    "mixed": "mixed",
+}
+
+
+def build_schema(column_definitions=COLUMN_DEFINITIONS):
+    """
+    {列名: {"kind": ..., 他の付加情報}} を返す。
+    """
+    schema = {}
+    for col_def in column_definitions:
+        kind = _KIND_BY_TYPE.get(col_def["type"], "string")
+        spec = {"kind": kind}
+        if kind == "category":
+            spec["choices"] = list(col_def.get("choices", []))
+        elif kind == "date":
+            spec["format"] = col_def.get("format", "%Y-%m-%d")
+        elif kind in ("quantity", "mixed"):
+            spec["decimals"] = col_def.get("decimals", 2)
+        schema[col_def["name"]] = spec
+
+    for name in EXTRA_CATEGORICAL_COLUMNS:
+        schema.setdefault(name, {"kind": "category", "choices": []})
+
+    for name in CHECKLIST_COLUMNS:
+        if name in schema:
+            schema[name]["checklist"] = True
+
+    return schema
+
+
+SCHEMA = build_schema()
+
+# キャッシュに書く列の持ち方の版（型の変換を変えたら上げる。schema_version に入る）
+STORAGE_VERSION = 3
+
+
+def schema_version(schema=SCHEMA) -> str:
+    """
+    スキーマ・列の持ち方が変わったらキャッシュを作り直せるよう、そのハッシュを返す。
+    """
+    raw = json.dumps([schema, STORAGE_VERSION], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+    return pd.StringDtype("pyarrow")
+
+
+def _use_dictionary(s: pd.Series) -> bool:
+    """
+    チェックリストの列を辞書化するか（値の種類が行数の DICTIONARY_MAX_RATIO 以下なら）。
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return True
+    present = int(s.notna().sum())
+    return present > 0 and s.nunique(dropna=True) <= present * DICTIONARY_MAX_RATIO
+
+
+def dictionary_columns(df: pd.DataFrame, schema=SCHEMA):
+    """
+    apply_schema() 済みの df で辞書化されたチェックリストの列
+    （チャンクごとに変換するときに、2 つ目以降のチャンクを最初のチャンクにそろえる）。
+    """
+    return [
+        col for col in df.columns
+        if schema.get(col, {}).get("checklist")
+        and isinstance(df[col].dtype, pd.CategoricalDtype)
+    ]
+
+
+def apply_schema(df: pd.DataFrame, schema=SCHEMA, dictionary=None) -> pd.DataFrame:
+    """
+    DataFrame の各列をスキーマの型に変換する（スキーマに無い列はそのまま）。
+    dictionary を渡すと、チェックリストの列はその列だけを辞書化する
+    （None なら列ごとに値の種類の割合で決める）。
+    """
+    string_dtype = _string_dtype()
+    out = {}
+
+    for col in df.columns:
+        s = df[col]
+        spec = schema.get(col)
+        kind = spec["kind"] if spec else None
+        checklist = bool(spec and spec.get("checklist"))
+        if checklist:
+            checklist = col in dictionary if dictionary is not None else _use_dictionary(s)
+
+        if kind == "category" or checklist:
+            # ソート順が文字列順と一致するよう、カテゴリは辞書順で並べる
+            observed = s.dropna().astype(str).unique().tolist()
+            categories = sorted(set(spec.get("choices", [])) | set(observed))
+            s = s.astype(pd.CategoricalDtype(categories))
+        elif kind == "date":
+            if not pd.api.types.is_datetime64_any_dtype(s):
+                s = pd.to_datetime(s, format=spec["format"], errors="coerce")
+        elif kind == "quantity":
+            s = pd.to_numeric(s, errors="coerce").astype(np.float32)
+        elif kind == "mixed":
+            if not isinstance(s.dtype, MixedDtype):
+                s = s.astype(MixedDtype(spec["decimals"]))
+        elif kind == "string":
+            s = s.astype(string_dtype)
+
+        out[col] = s
+
+    return pd.DataFrame(out, index=df.index)
+
+
+def sort_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    category 列のカテゴリを辞書順にそろえる（既にそろっていれば何もしない）。
+    キャッシュは辞書順の辞書で書く（dataset_loader._unify_dictionaries）ので、
+    キャッシュから読んだ列は確かめるだけで並べ替えない。
+    """
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cats = s.cat.categories
+            if not cats.is_monotonic_increasing:
+                df[col] = s.cat.reorder_categories(sorted(cats))
+    return df
+
+
+def _to_categories(s, dtype):
+    if s.dtype == dtype:
+        return s
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.set_categories(dtype.categories)
+    return s.astype(object).astype(dtype)
+
+
+def concat_frames(frames) -> pd.DataFrame:
+    """
+    型変換済みの DataFrame を縦に結合する。
+    category 列はカテゴリを和集合（辞書順）にそろえてから結合する
+    （そろえないと pandas が object 列に戻してしまう）。
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    columns = frames[0].columns
+    for col in columns:
+        dtypes = [f[col].dtype for f in frames]
+        if isinstance(dtypes[0], pd.CategoricalDtype):
+            categories = set()
+            for f in frames:
+                s = f[col]
+                if isinstance(s.dtype, pd.CategoricalDtype):
+                    categories |= set(s.cat.categories)
+                else:
+                    categories |= set(s.dropna().astype(str).unique())
+            dtype = pd.CategoricalDtype(sorted(categories))
+            frames = [f.assign(**{col: _to_categories(f[col], dtype)}) for f in frames]
+        elif any(d != dtypes[0] for d in dtypes):
+            frames = [f.assign(**{col: f[col].astype(dtypes[0])}) for f in frames]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def concat_rows(base: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    base の後ろに delta の行を足す（列は base にそろえる）。
+    """
+    return concat_frames([base, delta.reindex(columns=base.columns)])
+
+
+def decode_page(df: pd.DataFrame, schema=SCHEMA):
+    """
+    DataTable に返すページ分だけ、型付きの列を表示用の値に戻して records にする。
+    - date     → "YYYY-MM-DD"
+    - quantity → decimals 桁で丸めた float（float32 の誤差を見せない）
+    - mixed    → 数値は decimals 桁の表記、文字列はそのまま（ページの行だけ戻す）
+    - category / 文字列 → str（欠損は None）
+    列ごとに Python の値のリストにしてから行にまとめる（DataFrame 全体の astype はしない）。
+    """
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        spec = schema.get(col) or {}
+        kind = spec.get("kind")
+        if kind == "date" and pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime(spec["format"])
+        elif kind == "quantity":
+            s = s.astype(np.float64).round(spec["decimals"])
+        missing = s.isna().to_numpy()
+        values = s.to_numpy(dtype=object)
+        values[missing] = None
+        columns[col] = values.tolist()
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def combine_chunks(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    arrow 文字列の列を 1 チャンクにまとめる。
+    Parquet から読むと行グループごとのチャンクに分かれていて、
+    take（ページの行の取り出し）のたびにチャンクをまたぐ分だけ遅くなるため。
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df
+
+    for col in df.columns:
+        s = df[col]
+        if not (isinstance(s.dtype, pd.ArrowDtype)
+                or (isinstance(s.dtype, pd.StringDtype) and s.dtype.storage == "pyarrow")):
+            continue
+        arrow = pa.array(s.array)
+        if isinstance(arrow, pa.ChunkedArray) and arrow.num_chunks > 1:
+            df[col] = pd.array(arrow.combine_chunks(), dtype=s.dtype)
+    return df
+
+
+def memory_report(before, after, label=""):
+    """
+    型変換前後のメモリ使用量を表示する（DataFrame or バイト数）。
+    """
+    def nbytes(x):
+        if isinstance(x, pd.DataFrame):
+            return x.memory_usage(deep=True).sum()
+        return x
+
+    b, a = nbytes(before), nbytes(after)
+    ratio = a / b if b else 0
+    prefix = f"[dataset] {label}: " if label else "[dataset] "
+    print(
+        f"{prefix}memory {b / 1e6:,.1f} MB -> {a / 1e6:,.1f} MB "
+        f"({ratio:.0%} of original)"
+    )
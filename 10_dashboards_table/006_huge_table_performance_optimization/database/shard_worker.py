@@ -0,0 +1,34 @@
+# database/shard_worker.py
+"""
+シャードのワーカープロセスの入口（python -m database.shard_worker <ソケットの fd>）。
+
+database/queries_sharded.py がシャードごとに 1 つ起動する。
+multiprocessing の spawn と違って親の __main__（app.py）を import し直さないので、
+ワーカーごとにレイアウトの構築（データセットの読み込み）やファイルの監視が走ることはない。
+親とは起動時に受け継いだソケット（multiprocessing の Connection）1 本でつなぎ、
+(関数, 引数) を受け取っては (成功したか, 結果 / 例外) を返す。親が終わって接続が切れたら終わる。
+"""
+import sys
+import traceback
+from multiprocessing.connection import Connection
+
+
+def serve(conn):
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:  # 結果・例外が pickle できないときは文字列にして返す
+            conn.send((False, RuntimeError(traceback.format_exc())))
+
+
+if __name__ == "__main__":
+    with Connection(int(sys.argv[1])) as conn:
+        serve(conn)
@@ -0,0 +1,181 @@
+# database/snapshot.py
+"""
+データセットの派生データ（ユニーク日付・チェックリストの選択肢・min/max・
+mixed 列の分割・インデックスなど）のスナップショット。
+
+派生データは起動のたびに作り直すと時間がかかるので、
+Dataset.cached() に溜まったものをまとめてファイルに書き出し、
+次回の読み込み時にメモリマップで読み戻す。
+
+- ファイルは database/.cache/<CSV 名>.<中身のハッシュ>.snapshot
+  （CSV の中身・スキーマ・スナップショット形式が変わったら使わない）
+- pickle（protocol 5）の out-of-band バッファを使い、NumPy 配列の中身は
+  ファイル上にそのまま並べる。読み戻すときはファイルをメモリマップして
+  配列をその上に作るので、コピーせずにすぐ使える（配列は読み取り専用）
+- 書き込みは一時ファイルに書いてから置き換える
+"""
+import json
+import mmap
+import pickle
+import struct
+import time
+
+from database.dataset_loader import CACHE_DIR
+from database.schema import schema_version
+
+# 形式を変えたら上げる（古いスナップショットは使わない）
+SNAPSHOT_FORMAT = 1
+
+_MAGIC = b"DSNAPSH1"
+_HEADER = struct.Struct("<8sQ")   # magic, ヘッダー（JSON）のバイト数
+_ALIGN = 64
+
+
+def snapshot_path(dataset):
+    """
+    データセットのスナップショットのパス（ファイル由来でない・ハッシュ不明なら None）。
+    """
+    if dataset.path is None or not dataset.content_hash:
+        return None
+    return CACHE_DIR / f"{dataset.path.stem}.{dataset.content_hash}.snapshot"
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _picklable_items(items):
+    """
+    pickle できる派生データだけを残す（関数などを含むものは毎回作り直す）。
+    """
+    out = {}
+    for key, value in items.items():
+        try:
+            pickle.dumps((key, value), protocol=5, buffer_callback=lambda b: None)
+        except Exception:
+            continue
+        out[key] = value
+    return out
+
+
+def save_snapshot(dataset, verbose=True):
+    """
+    dataset の派生データをスナップショットに書き出す。
+    追記（append_rows）後の版はファイルの中身と一致しないので書かない。
+    同じ版のスナップショットが既にあり、そこに無い派生データも増えていなければ書き直さない。
+    戻り値: 書いたパス / 書かなかったら None
+    """
+    path = snapshot_path(dataset)
+    if path is None or dataset.generation:
+        return None
+    derived = dataset.snapshot_items()
+    if path.exists() and set(derived) <= dataset.snapshot_keys:
+        return None
+    items = _picklable_items(derived)
+    if not items:
+        return None
+
+    started = time.perf_counter()
+    buffers = []
+    payload = pickle.dumps(items, protocol=5, buffer_callback=buffers.append)
+    raws = [b.raw() for b in buffers]
+
+    offset = _align(len(payload))
+    layout = []
+    for raw in raws:
+        layout.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    header = json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "schema": schema_version(),
+        "hash": dataset.content_hash,
+        "rows": len(dataset),
+        "payload": len(payload),
+        "buffers": layout,
+    }).encode("utf-8")
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        base = f.tell()
+        f.write(payload)
+        for (buf_offset, _), raw in zip(layout, raws):
+            f.write(b"\0" * (base + buf_offset - f.tell()))
+            f.write(raw)
+    tmp_path.replace(path)
+    # pickle できずに入れなかったものも、次に書くかどうかの判定では書いた扱いにする
+    dataset.snapshot_keys = frozenset(derived)
+
+    # 同じ CSV の古いスナップショットは消す
+    for old in path.parent.glob(f"{dataset.path.stem}.*.snapshot"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+    if verbose:
+        elapsed = time.perf_counter() - started
+        print(
+            f"[dataset] {dataset.path.name}: saved snapshot "
+            f"({len(items)} items, {path.stat().st_size / 1e6:,.1f} MB) in {elapsed:.3f}s"
+        )
+    return path
+
+
+def load_snapshot(dataset):
+    """
+    dataset に対応するスナップショットを読み戻す（メモリマップ）。
+    戻り値: {key: 派生データ} / 無い・使えないときは None
+    """
+    path = snapshot_path(dataset)
+    if path is None or not path.exists():
+        return None
+
+    with path.open("rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, header_len = _HEADER.unpack_from(view, 0)
+    if magic != _MAGIC:
+        return None
+    header = json.loads(bytes(view[_HEADER.size:_HEADER.size + header_len]))
+    if (
+        header.get("format") != SNAPSHOT_FORMAT
+        or header.get("schema") != schema_version()
+        or header.get("hash") != dataset.content_hash
+        or header.get("rows") != len(dataset)
+    ):
+        return None
+
+    base = _align(_HEADER.size + header_len)
+    payload = view[base:base + header["payload"]]
+    buffers = [view[base + offset:base + offset + size] for offset, size in header["buffers"]]
+    # 配列は mapped の上に作られる（参照が残っている間はマップも残る）
+    return pickle.loads(payload, buffers=buffers)
+
+
+def restore_snapshot(dataset, verbose=True):
+    """
+    スナップショットがあれば dataset の派生データとして読み戻す。
+    壊れている・合わないスナップショットは無視する（派生データは必要時に作り直される）。
+    """
+    started = time.perf_counter()
+    try:
+        items = load_snapshot(dataset)
+    except Exception as e:
+        print(f"[dataset] snapshot read failed ({e}); rebuilding derived data")
+        return 0
+    if not items:
+        return 0
+
+    dataset.restore_items(items)
+    dataset.snapshot_keys = frozenset(items)
+    if verbose:
+        elapsed = time.perf_counter() - started
+        print(
+            f"[dataset] {dataset.path.name}: restored {len(items)} items "
+            f"from snapshot in {elapsed * 1000:.1f}ms"
+        )
+    return len(items)